@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey, Table, Enum, LargeBinary, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, Boolean, Date, DateTime, ForeignKey, Table, Enum, LargeBinary, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -285,6 +285,7 @@ class UserActivityLog(Base):
     # Additional data
     details = Column(JSON, nullable=True)  # Flexible data storage
     description = Column(Text, nullable=True)
+    sample_weight = Column(Integer, default=1, server_default="1", nullable=False)  # Requests this row stands for (log sampling)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
@@ -300,8 +301,9 @@ class APIRequestLog(Base):
 
     # Request details
     method = Column(String(10), nullable=False, index=True)  # GET, POST, PUT, DELETE, etc.
-    path = Column(String(500), nullable=False, index=True)  # /api/products, /api/orders, etc.
-    endpoint = Column(String(500), nullable=True)  # Specific endpoint name
+    path = Column(String(500), nullable=False, index=True)  # /api/products/123, /api/orders, etc.
+    route = Column(String(500), nullable=True, index=True)  # Matched route template, e.g. /api/products/{product_id}
+    endpoint = Column(String(500), nullable=True)  # "METHOD /route/template"
 
     # Response details
     status_code = Column(Integer, nullable=True, index=True)  # 200, 404, 500, etc.
@@ -311,12 +313,67 @@ class APIRequestLog(Base):
     ip_address = Column(String(45), nullable=True, index=True)
     user_agent = Column(String(500), nullable=True)
     query_params = Column(JSON, nullable=True)  # Query parameters
+    sample_weight = Column(Integer, default=1, server_default="1", nullable=False)  # Requests this row stands for (log sampling)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Relationships
     user = relationship("User")
 
+class APIRequestRollup(Base):
+    """Per-minute API request aggregates per (route, method, status class); compacted to hourly/daily rows as they age"""
+    __tablename__ = "api_request_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    minute = Column(DateTime(timezone=True), nullable=False, index=True)
+    route = Column(String(500), nullable=False)  # Route template, e.g. /api/products/{product_id}
+    method = Column(String(10), nullable=False)
+    status_class = Column(String(3), nullable=False)  # 2xx, 3xx, 4xx, 5xx
+
+    request_count = Column(Integer, nullable=False)
+    total_time = Column(Float, nullable=False)  # Sum of response times in seconds
+    max_time = Column(Float, nullable=False)
+    sketch = Column(JSON, nullable=False)  # Latency sketch buckets in ms (see app/services/api_rollups.py)
+
+class DailySales(Base):
+    """Per-day order totals (UTC day of order creation), kept current by app/services/sales_rollup.py"""
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)  # All orders created that day
+    items = Column(Integer, nullable=False, default=0)  # Item quantity of all orders
+    completed_orders = Column(Integer, nullable=False, default=0)
+    completed_items = Column(Integer, nullable=False, default=0)
+    completed_revenue = Column(Float, nullable=False, default=0)  # Sum of total_amount of completed orders
+
+class DailyCategorySales(Base):
+    """Per-day, per-category sales of completed orders (category at the time of sale)"""
+    __tablename__ = "daily_category_sales"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    completed_items = Column(Integer, nullable=False, default=0)
+    completed_revenue = Column(Float, nullable=False, default=0)  # Sum of item price * quantity
+
+class DailyProductFunnel(Base):
+    """Per-day, per-product conversion funnel counts folded in from user_activity_logs by app/services/funnel.py"""
+    __tablename__ = "daily_product_funnel"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)  # No foreign key: counts outlive deleted products
+    views = Column(Integer, nullable=False, default=0)
+    cart_adds = Column(Integer, nullable=False, default=0)
+    checkout_starts = Column(Integer, nullable=False, default=0)
+    checkout_completes = Column(Integer, nullable=False, default=0)
+
+class RollupWatermark(Base):
+    """Last source row id folded into an incremental rollup"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
 # Banner Status Enum
 class BannerStatus(str, enum.Enum):
     ACTIVE = "active"
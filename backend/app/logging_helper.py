@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
-from app.db_models import OrderLog, UserActivityLog, LogAction, UserActivityType
+from app.db_models import OrderLog, LogAction, UserActivityType
+from app.services.log_writer import activity_log_writer
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from fastapi import Request
 
@@ -36,8 +38,12 @@ def log_order_event(
         print(f"Failed to log order event: {e}")
         db.rollback()
 
+VALID_ACTIVITY_TYPES = frozenset(member.value for member in UserActivityType)
+
+# details["origin"] of rows posted through the public client-side tracking endpoints (untrusted)
+CLIENT_ORIGIN = "client"
+
 def log_user_activity(
-    db: Session,
     activity_type: str,  # Accept string (lowercase enum value)
     user_id: Optional[int] = None,
     resource_type: Optional[str] = None,
@@ -45,8 +51,16 @@ def log_user_activity(
     description: Optional[str] = None,
     details: Optional[Dict[str, Any]] = None,
     request: Optional[Request] = None,
+    sample_weight: int = 1,
+    user_email: Optional[str] = None,
 ):
-    """Helper function to log user activities"""
+    """
+    Helper function to log user activities.
+
+    Only queues the row; it is written in batches by the activity log writer,
+    so it never touches (or commits) the caller's session. `user_email` may
+    be given instead of `user_id` and is resolved when the batch is written.
+    """
     try:
         ip_address = None
         user_agent = None
@@ -71,26 +85,25 @@ def log_user_activity(
                 details["query_params"] = request.url.query
 
         # Validate that activity_type is a valid enum value
-        valid_values = [member.value for member in UserActivityType]
-        if activity_type not in valid_values:
+        if activity_type not in VALID_ACTIVITY_TYPES:
             print(f"Warning: Unknown activity type '{activity_type}'")
-            print(f"Valid values: {valid_values}")
+            print(f"Valid values: {sorted(VALID_ACTIVITY_TYPES)}")
             # Don't save invalid activity types
             return
 
-        log = UserActivityLog(
-            user_id=user_id,
-            activity_type=activity_type,  # Pass string directly, not enum
-            resource_type=resource_type,
-            resource_id=resource_id,
-            description=description,
-            details=details,
-            ip_address=ip_address,
-            user_agent=user_agent,
-        )
-        db.add(log)
-        db.commit()
+        activity_log_writer.enqueue({
+            "user_id": user_id,
+            "user_email": user_email,
+            "activity_type": activity_type,  # Pass string directly, not enum
+            "resource_type": resource_type[:50] if resource_type else None,
+            "resource_id": resource_id,
+            "description": description,
+            "details": details,
+            "ip_address": ip_address[:45] if ip_address else None,
+            "user_agent": user_agent[:500] if user_agent else None,
+            "sample_weight": sample_weight,
+            "created_at": datetime.now(timezone.utc)
+        })
     except Exception as e:
         print(f"Failed to log user activity: {e}")
         print(f"Activity type was: {activity_type}")
-        db.rollback()
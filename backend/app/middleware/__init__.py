@@ -1,4 +1,8 @@
 from .logging_middleware import LoggingMiddleware
 from .api_logging_middleware import APILoggingMiddleware
+from .metrics_middleware import MetricsMiddleware
+from .query_stats_middleware import QueryStatsMiddleware
+from .profiler_middleware import ProfilerMiddleware
+from .memory_middleware import MemoryMiddleware
 
-__all__ = ['LoggingMiddleware', 'APILoggingMiddleware']
+__all__ = ['LoggingMiddleware', 'APILoggingMiddleware', 'MetricsMiddleware', 'QueryStatsMiddleware', 'ProfilerMiddleware', 'MemoryMiddleware']
@@ -1,8 +1,9 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.db_models import APIRequestLog, User
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.log_writer import api_log_writer
+from app.services.log_sampler import UNMATCHED_ROUTE, log_sampler, route_key, route_template
+from app.services.api_rollups import api_rollups
+from datetime import datetime, timezone
 import time
 import jwt
 import os
@@ -11,80 +12,101 @@ import os
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 
-class APILoggingMiddleware(BaseHTTPMiddleware):
+# Per-request rows in api_request_logs; rollups and /metrics are unaffected when disabled
+API_REQUEST_LOGGING = os.getenv("API_REQUEST_LOGGING", "true").lower() == "true"
+
+class APILoggingMiddleware:
     """
     Middleware to log all API requests (separate from user activity tracking).
     Tracks API performance, errors, and usage patterns.
+
+    Pure ASGI: it wraps `send` to read the status code and add the timing
+    header, and never touches the response body, so streaming responses
+    pass through unbuffered.
     """
 
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+
         # Only log API endpoints
-        if not request.url.path.startswith('/api/'):
-            return await call_next(request)
+        if not path.startswith('/api/'):
+            return await self.app(scope, receive, send)
 
-        # Skip logging for the logs endpoints themselves to avoid recursion
-        if request.url.path.startswith('/api/logs/'):
-            return await call_next(request)
+        # Skip logging for the logs and monitoring endpoints themselves to avoid recursion
+        if path.startswith(('/api/logs/', '/api/monitoring/')):
+            return await self.app(scope, receive, send)
 
         # Get start time
         start_time = time.time()
+        status_code = 500  # Reported if the app fails before sending a response
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add response time header
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(time.time() - start_time))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            response_time = time.time() - start_time
+            # Every request feeds the per-minute rollups, before sampling
+            api_rollups.record(route_template(scope) or UNMATCHED_ROUTE, scope["method"], status_code, response_time)
+            if API_REQUEST_LOGGING:
+                # Errors and slow requests are always kept; healthy high-volume routes are sampled
+                sample_weight = log_sampler.sample(route_key(scope), status_code, response_time)
+                if sample_weight:
+                    self._log(scope, status_code, response_time, sample_weight)
+
+    def _log(self, scope: Scope, status_code: int, response_time: float, sample_weight: int):
+        headers = Headers(scope=scope)
+        method = scope["method"]
+        path = scope["path"]
+        route = route_template(scope) or UNMATCHED_ROUTE
 
-        # Try to get user from token
-        user_id = None
-        token = request.headers.get("Authorization")
+        # Try to get user from token (resolved to a user id by the log writer)
+        user_email = None
+        token = headers.get("Authorization")
         if token and token.startswith("Bearer "):
             try:
                 token = token.replace("Bearer ", "")
                 # Decode JWT token
                 payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
                 if payload:
-                    # Get user_id from database
-                    db = SessionLocal()
-                    try:
-                        user = db.query(User).filter(User.email == payload.get("sub")).first()
-                        if user:
-                            user_id = user.id
-                    finally:
-                        db.close()
+                    user_email = payload.get("sub")
             except:
                 pass
 
-        # Process the request
-        response = await call_next(request)
-
-        # Calculate response time
-        response_time = time.time() - start_time
-
         # Get request metadata
-        ip_address = request.client.host if request.client else None
-        user_agent = request.headers.get("user-agent", None)
+        client = scope.get("client")
+        ip_address = client[0] if client else None
+        user_agent = headers.get("user-agent", None)
 
         # Parse query parameters
-        query_params = dict(request.query_params) if request.query_params else None
-
-        # Log the API request
-        db = SessionLocal()
-        try:
-            log = APIRequestLog(
-                user_id=user_id,
-                method=request.method,
-                path=request.url.path,
-                endpoint=f"{request.method} {request.url.path}",
-                status_code=response.status_code,
-                response_time=response_time,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                query_params=query_params
-            )
-            db.add(log)
-            db.commit()
-        except Exception as e:
-            print(f"Failed to log API request: {e}")
-            db.rollback()
-        finally:
-            db.close()
-
-        # Add response time header
-        response.headers["X-Process-Time"] = str(response_time)
+        query_string = scope.get("query_string", b"")
+        query_params = dict(QueryParams(query_string)) if query_string else None
 
-        return response
+        # Queue the API request log; it is written in batches off the request path
+        api_log_writer.enqueue({
+            "user_email": user_email,
+            "method": method,
+            "path": path[:500],
+            "route": route[:500],
+            "endpoint": f"{method} {route}"[:500],
+            "status_code": status_code,
+            "response_time": response_time,
+            "ip_address": ip_address,
+            "user_agent": user_agent[:500] if user_agent else None,
+            "query_params": query_params,
+            "sample_weight": sample_weight,
+            "created_at": datetime.now(timezone.utc)
+        })
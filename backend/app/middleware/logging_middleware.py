@@ -1,9 +1,9 @@
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.db_models import UserActivityType, User
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.db_models import UserActivityType
 from app.logging_helper import log_user_activity
+from app.services.log_sampler import log_sampler, route_key
 import time
 import jwt
 import os
@@ -12,24 +12,51 @@ import os
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """
     Middleware to log all requests to the system.
     Logs every page visit, API call, and user interaction.
+
+    Pure ASGI: only `send` is wrapped (to add the timing header), so the
+    response body is never buffered.
     """
 
-    async def dispatch(self, request: Request, call_next):
-        # Skip logging for static files, health checks, and all API endpoints
-        # API endpoints are logged separately by APILoggingMiddleware
-        skip_paths = ['/static/', '/_next/', '/favicon.ico', '/health', '/api/']
-        if any(request.url.path.startswith(path) for path in skip_paths):
-            return await call_next(request)
+    # Skip logging for static files, health checks, and all API endpoints
+    # API endpoints are logged separately by APILoggingMiddleware
+    SKIP_PATHS = ('/static/', '/_next/', '/favicon.ico', '/health', '/metrics', '/api/')
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.SKIP_PATHS):
+            return await self.app(scope, receive, send)
 
         # Get start time
         start_time = time.time()
+        status_code = 500  # Reported if the app fails before sending a response
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Calculate response time
+                process_time = time.time() - start_time
+                MutableHeaders(scope=message).append("X-Process-Time", str(process_time))
+            await send(message)
 
-        # Try to get user from token
-        user_id = None
+        # Process the request
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Errors and slow requests are always kept; high-volume pages are sampled
+            sample_weight = log_sampler.sample(route_key(scope), status_code, time.time() - start_time)
+            if sample_weight:
+                self._log(Request(scope), sample_weight)
+
+    def _log(self, request: Request, sample_weight: int):
+        # Try to get the user's email from the token; it is resolved to an id when the batch is written
+        user_email = None
         token = request.headers.get("Authorization")
         if token and token.startswith("Bearer "):
             try:
@@ -37,43 +64,21 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 # Decode JWT token
                 payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
                 if payload:
-                    # Get user_id from database
-                    db = SessionLocal()
-                    try:
-                        user = db.query(User).filter(User.email == payload.get("sub")).first()
-                        if user:
-                            user_id = user.id
-                    finally:
-                        db.close()
+                    user_email = payload.get("sub")
             except:
                 pass
 
         # Determine activity type based on path and method
         activity_type = self._determine_activity_type(request.url.path, request.method)
 
-        # Log the activity
-        db = SessionLocal()
-        try:
-            log_user_activity(
-                db=db,
-                activity_type=activity_type.value,  # Use .value to get the string value
-                user_id=user_id,
-                request=request,
-                description=f"{request.method} {request.url.path}"
-            )
-        except Exception as e:
-            print(f"Failed to log request: {e}")
-        finally:
-            db.close()
-
-        # Process the request
-        response = await call_next(request)
-
-        # Calculate response time
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-
-        return response
+        # Queue the activity (never blocks or touches the database here)
+        log_user_activity(
+            activity_type=activity_type.value,  # Use .value to get the string value
+            user_email=user_email,
+            request=request,
+            description=f"{request.method} {request.url.path}",
+            sample_weight=sample_weight
+        )
 
     def _determine_activity_type(self, path: str, method: str) -> UserActivityType:
         """Determine the activity type based on the request path and method"""
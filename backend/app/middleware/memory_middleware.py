@@ -0,0 +1,26 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.services.log_sampler import UNMATCHED_ROUTE, route_template
+from app.services.memory_tracker import memory_tracker
+
+class MemoryMiddleware:
+    """
+    Middleware to record per-route peak allocations while tracemalloc
+    tracing is switched on (a single attribute check otherwise).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not memory_tracker.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = memory_tracker.request_started()
+        if started is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = route_template(scope) or UNMATCHED_ROUTE
+            memory_tracker.request_finished(f"{scope['method']} {route}", started)
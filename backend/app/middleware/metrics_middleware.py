@@ -0,0 +1,38 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.log_sampler import UNMATCHED_ROUTE, route_template
+from app.services.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+import time
+
+class MetricsMiddleware:
+    """
+    Middleware to record Prometheus request metrics.
+    Requests are labelled by route template (not raw path) to keep label
+    cardinality bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        start_time = time.perf_counter()
+        status_code = 500  # Reported if the app fails before sending a response
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = route_template(scope) or UNMATCHED_ROUTE
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start_time)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
@@ -0,0 +1,45 @@
+import sys
+import threading
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.profiler import request_profiler
+
+class ProfilerMiddleware:
+    """
+    Middleware to run the on-demand sampling profiler.
+
+    Does nothing unless an admin armed the profiler; then the next matching
+    requests are sampled on a background thread while they run, with this
+    middleware's frame marking where the request's stack starts.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not request_profiler.armed or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = request_profiler.claim(scope)
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        done = threading.Event()
+        sampler = threading.Thread(
+            target=request_profiler.sample,
+            args=(profile, sys._getframe(), threading.get_ident(), done),
+            name="request-profiler", daemon=True
+        )
+        start_time = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            done.set()
+            sampler.join()
+            request_profiler.finish(profile, time.perf_counter() - start_time)
@@ -0,0 +1,68 @@
+import json
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import DB_REQUEST_QUERIES, DB_REQUEST_TIME
+from app.services.query_stats import DEBUG, QUERY_CHECKS, RequestQueryStats, current_query_stats, query_violations
+
+class QueryStatsMiddleware:
+    """
+    Middleware to count SQL statements and DB time per request.
+
+    The SQLAlchemy cursor hooks add to the request's RequestQueryStats through
+    a context variable (threadpool work inherits it). Totals are recorded per
+    route template in metrics; in DEBUG mode they are also returned as
+    X-DB-Queries / X-DB-Time (ms) headers, covering the queries made before
+    the response started.
+
+    With QUERY_CHECKS on, requests over their route's query budget or running
+    the same statement N_PLUS_ONE_THRESHOLD+ times are logged; in strict mode
+    such a response is replaced by a 500 listing the violations.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestQueryStats(scope)
+        token = current_query_stats.set(stats)
+        failed = False
+
+        async def send_wrapper(message: Message):
+            nonlocal failed
+            if failed:
+                return
+            if message["type"] == "http.response.start":
+                if QUERY_CHECKS == "strict":
+                    violations = stats.violations()
+                    if violations:
+                        failed = True
+                        body = json.dumps({"detail": "SQL query checks failed", "violations": violations}).encode()
+                        message = {
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [(b"content-type", b"application/json"),
+                                        (b"content-length", str(len(body)).encode())]
+                        }
+                        await send(message)
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                if DEBUG:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-DB-Queries", str(stats.queries))
+                    headers.append("X-DB-Time", f"{stats.db_time * 1000:.2f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            route = stats.route
+            DB_REQUEST_QUERIES.labels(route).observe(stats.queries)
+            DB_REQUEST_TIME.labels(route).observe(stats.db_time)
+            if QUERY_CHECKS != "off":
+                violations = stats.violations()
+                if violations:
+                    query_violations.record(stats, violations)
@@ -8,3 +8,4 @@ from .orders import router as orders_router
 from .banners import router as banners_router
 from .addresses import router as addresses_router
 from .wishlists import router as wishlists_router
+from .cart import router as cart_router
@@ -1,124 +1,32 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, extract, cast, Date
-from app.database import get_db
-from app.db_models import User, Product, ProductComment, Order, OrderStatus, OrderItem
+from sqlalchemy import func, desc
+from app.db_models import User, Product, ProductComment, DailySales, DailyCategorySales
 from app.auth import get_current_admin_user
-from typing import Dict, List
-from datetime import datetime, timedelta
+from app.services.analytics_cache import ANALYTICS_TRENDING_CACHE_TTL, cached
+from app.services.dashboard_stats import dashboard_stats
+from app.services.funnel import funnel_report
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta, timezone
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
 
 @router.get("/dashboard", response_model=Dict)
 async def get_dashboard_stats(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
-    """Get dashboard statistics (Admin only)"""
-
-    # Total users count
-    total_users = db.query(User).filter(User.role == "user").count()
-
-    # Total admin count
-    total_admins = db.query(User).filter(User.role == "admin").count()
-
-    # Total products count
-    total_products = db.query(Product).count()
-
-    # Total comments/reviews count
-    total_comments = db.query(ProductComment).count()
-
-    # Average rating
-    avg_rating_result = db.query(func.avg(ProductComment.rating)).scalar()
-    avg_rating = round(float(avg_rating_result), 2) if avg_rating_result else 0.0
-
-    # Products with low stock (less than 10)
-    low_stock_products = db.query(Product).filter(Product.stock < 10).count()
-
-    # Products by category
-    products_by_category = db.query(
-        Product.category,
-        func.count(Product.id).label('count')
-    ).group_by(Product.category).all()
-
-    category_stats = {}
-    for category, count in products_by_category:
-        category_name = str(category) if category else "Uncategorized"
-        category_stats[category_name] = count
-
-    # Recent activity (comments in last 7 days)
-    from datetime import datetime, timedelta
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    recent_comments_count = db.query(ProductComment).filter(
-        ProductComment.created_at >= seven_days_ago
-    ).count()
-
-    # Top rated products
-    top_rated = db.query(
-        Product.id,
-        Product.name,
-        func.avg(ProductComment.rating).label('avg_rating'),
-        func.count(ProductComment.id).label('review_count')
-    ).join(ProductComment).group_by(Product.id, Product.name)\
-     .having(func.count(ProductComment.id) >= 1)\
-     .order_by(desc('avg_rating')).limit(5).all()
-
-    top_rated_products = []
-    for product_id, product_name, avg_rating, review_count in top_rated:
-        top_rated_products.append({
-            "id": product_id,
-            "name": product_name,
-            "avg_rating": round(float(avg_rating), 2),
-            "review_count": review_count
-        })
-
-    # Order statistics
-    total_orders = db.query(Order).count()
-    pending_orders = db.query(Order).filter(Order.status == OrderStatus.PENDING).count()
-    processing_orders = db.query(Order).filter(Order.status == OrderStatus.PROCESSING).count()
-    completed_orders = db.query(Order).filter(Order.status == OrderStatus.COMPLETED).count()
-    cancelled_orders = db.query(Order).filter(Order.status == OrderStatus.CANCELLED).count()
-
-    # Total revenue from completed orders
-    total_revenue_result = db.query(func.sum(Order.total_amount)).filter(
-        Order.status == OrderStatus.COMPLETED,
-        Order.payment_status == "completed"
-    ).scalar()
-    total_revenue = float(total_revenue_result) if total_revenue_result else 0.0
-
-    # Recent orders (last 7 days)
-    recent_orders_count = db.query(Order).filter(
-        Order.created_at >= seven_days_ago
-    ).count()
-
-    return {
-        "total_users": total_users,
-        "total_admins": total_admins,
-        "total_products": total_products,
-        "total_comments": total_comments,
-        "avg_rating": avg_rating,
-        "low_stock_products": low_stock_products,
-        "products_by_category": category_stats,
-        "recent_comments_count": recent_comments_count,
-        "top_rated_products": top_rated_products,
-        "total_orders": total_orders,
-        "pending_orders": pending_orders,
-        "processing_orders": processing_orders,
-        "completed_orders": completed_orders,
-        "cancelled_orders": cancelled_orders,
-        "total_revenue": total_revenue,
-        "recent_orders_count": recent_orders_count
-    }
+    """Get dashboard statistics from the cached snapshot (Admin only)"""
+    return await dashboard_stats.get()
 
 @router.get("/products/trending", response_model=List[Dict])
 async def get_trending_products(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
     """Get trending products based on comments (Admin only)"""
+    return await cached(("trending",), _trending_products, ttl=ANALYTICS_TRENDING_CACHE_TTL)
 
+def _trending_products(db: Session) -> List[Dict]:
     # Products with most comments in last 30 days
-    from datetime import datetime, timedelta
     thirty_days_ago = datetime.now() - timedelta(days=30)
 
     trending = db.query(
@@ -150,82 +58,40 @@ async def get_trending_products(
 @router.get("/sales", response_model=List[Dict])
 async def get_sales_data(
     period: str = Query("month", regex="^(week|month|year)$"),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
     """Get sales data for charts based on period (Admin only)"""
+    return await cached(("sales", period), lambda db: _sales_data(db, period))
 
-    now = datetime.now()
-
+def _sales_data(db: Session, period: str) -> List[Dict]:
     # Determine date range based on period
-    if period == "week":
-        start_date = now - timedelta(days=7)
-        date_format = "%Y-%m-%d"
-        group_by_format = cast(Order.created_at, Date)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-        date_format = "%Y-%m-%d"
-        group_by_format = cast(Order.created_at, Date)
-    else:  # year
-        start_date = now - timedelta(days=365)
-        date_format = "%Y-%m"
-        # For year, group by month
-        group_by_format = func.to_char(Order.created_at, 'YYYY-MM')
+    days = {"week": 7, "month": 30, "year": 365}[period]
+    # `days` daily buckets, today included
+    start_day = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
 
-    # Query sales data grouped by date
+    # One daily_sales row per day: at most 365 rows, read by primary key range
     # For revenue: only completed orders
     # For total orders: all orders
-    if period == "year":
-        # Revenue from completed orders
-        revenue_query = db.query(
-            func.to_char(Order.created_at, 'YYYY-MM').label('date'),
-            func.sum(Order.total_amount).label('revenue')
-        ).filter(
-            Order.created_at >= start_date,
-            Order.status == OrderStatus.COMPLETED
-        ).group_by(func.to_char(Order.created_at, 'YYYY-MM')).all()
-
-        # Total orders (all statuses)
-        orders_query = db.query(
-            func.to_char(Order.created_at, 'YYYY-MM').label('date'),
-            func.count(Order.id).label('total_orders')
-        ).filter(
-            Order.created_at >= start_date
-        ).group_by(func.to_char(Order.created_at, 'YYYY-MM')).all()
-    else:
-        # Revenue from completed orders
-        revenue_query = db.query(
-            cast(Order.created_at, Date).label('date'),
-            func.sum(Order.total_amount).label('revenue')
-        ).filter(
-            Order.created_at >= start_date,
-            Order.status == OrderStatus.COMPLETED
-        ).group_by(cast(Order.created_at, Date)).all()
-
-        # Total orders (all statuses)
-        orders_query = db.query(
-            cast(Order.created_at, Date).label('date'),
-            func.count(Order.id).label('total_orders')
-        ).filter(
-            Order.created_at >= start_date
-        ).group_by(cast(Order.created_at, Date)).all()
-
-    # Combine revenue and orders data
-    revenue_dict = {str(date) if isinstance(date, str) else date.strftime(date_format): float(revenue) if revenue else 0.0
-                    for date, revenue in revenue_query}
-    orders_dict = {str(date) if isinstance(date, str) else date.strftime(date_format): total_orders
-                   for date, total_orders in orders_query}
-
-    # Get all unique dates
-    all_dates = sorted(set(revenue_dict.keys()) | set(orders_dict.keys()))
+    rows = db.query(DailySales).filter(DailySales.day >= start_day).order_by(DailySales.day).all()
+
+    # For year, group by month
+    date_format = "%Y-%m" if period == "year" else "%Y-%m-%d"
+    totals = {}
+    for row in rows:
+        if not row.orders and not row.completed_revenue:
+            continue
+        date_str = row.day.strftime(date_format)
+        entry = totals.setdefault(date_str, {"revenue": 0.0, "orders": 0})
+        entry["revenue"] += row.completed_revenue
+        entry["orders"] += row.orders
 
     sales_data = []
-    for date_str in all_dates:
+    for date_str, entry in totals.items():
         sales_data.append({
             "date": date_str,
-            "revenue": revenue_dict.get(date_str, 0.0),
-            "sales": revenue_dict.get(date_str, 0.0),  # Sales same as revenue
-            "orders": orders_dict.get(date_str, 0)
+            "revenue": entry["revenue"],
+            "sales": entry["revenue"],  # Sales same as revenue
+            "orders": entry["orders"]
         })
 
     return sales_data
@@ -233,30 +99,25 @@ async def get_sales_data(
 @router.get("/sales/monthly", response_model=List[Dict])
 async def get_monthly_sales(
     year: int = Query(None),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
     """Get monthly sales data for the year (Admin only)"""
-
     target_year = year if year else datetime.now().year
+    return await cached(("sales_monthly", target_year), lambda db: _monthly_sales(db, target_year))
 
-    # Query monthly sales for the year
-    monthly_query = db.query(
-        extract('month', Order.created_at).label('month_num'),
-        func.sum(Order.total_amount).label('revenue'),
-        func.count(Order.id).label('orders')
-    ).filter(
-        extract('year', Order.created_at) == target_year,
-        Order.status == OrderStatus.COMPLETED
-    ).group_by(extract('month', Order.created_at)).order_by('month_num').all()
+def _monthly_sales(db: Session, target_year: int) -> List[Dict]:
+    # Completed orders and revenue per day of the year from the rollup
+    rows = db.query(DailySales).filter(
+        DailySales.day >= date(target_year, 1, 1),
+        DailySales.day <= date(target_year, 12, 31)
+    ).all()
 
     # Create a dict for existing data
     monthly_data_dict = {}
-    for month_num, revenue, orders in monthly_query:
-        monthly_data_dict[int(month_num)] = {
-            "revenue": float(revenue) if revenue else 0.0,
-            "orders": orders
-        }
+    for row in rows:
+        month_data = monthly_data_dict.setdefault(row.day.month, {"revenue": 0.0, "orders": 0})
+        month_data["revenue"] += row.completed_revenue
+        month_data["orders"] += row.completed_orders
 
     # Month names
     month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
@@ -277,19 +138,18 @@ async def get_monthly_sales(
 
 @router.get("/sales/by-category", response_model=List[Dict])
 async def get_category_sales(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
     """Get sales breakdown by product category (Admin only)"""
+    return await cached(("sales_by_category",), _category_sales)
 
-    # Query sales by category from completed orders
+def _category_sales(db: Session) -> List[Dict]:
+    # Sales by category of completed orders, from the per-day category rollup
     category_query = db.query(
-        Product.category,
-        func.sum(OrderItem.price * OrderItem.quantity).label('total_sales')
-    ).join(OrderItem, Product.id == OrderItem.product_id)\
-     .join(Order, OrderItem.order_id == Order.id)\
-     .filter(Order.status == OrderStatus.COMPLETED)\
-     .group_by(Product.category)\
+        DailyCategorySales.category,
+        func.sum(DailyCategorySales.completed_revenue).label('total_sales')
+    ).group_by(DailyCategorySales.category)\
+     .having(func.sum(DailyCategorySales.completed_items) > 0)\
      .order_by(desc('total_sales')).all()
 
     category_sales = []
@@ -308,3 +168,16 @@ async def get_category_sales(
         ]
 
     return category_sales
+
+@router.get("/funnel", response_model=Dict)
+async def get_funnel(
+    days: int = Query(30, ge=1, le=365),
+    product_id: Optional[int] = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get product view -> cart -> checkout conversion rates from the funnel rollup (Admin only)"""
+    end_day = datetime.now(timezone.utc).date()
+    start_day = end_day - timedelta(days=days - 1)
+    return await cached(("funnel", days, product_id, limit),
+                        lambda db: funnel_report(db, start_day, end_day, product_id, limit))
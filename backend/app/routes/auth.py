@@ -71,7 +71,6 @@ async def register(
 
     # Log user registration
     log_user_activity(
-        db=db,
         activity_type=UserActivityType.REGISTER.value,
         user_id=new_user.id,
         description=f"User {new_user.username} registered",
@@ -122,7 +121,6 @@ async def login(
 
     # Log user login
     log_user_activity(
-        db=db,
         activity_type=UserActivityType.LOGIN.value,
         user_id=user.id,
         description=f"User {user.username} logged in",
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from app.database import get_db
+from app.db_models import User, Product, UserActivityType
+from app.auth import get_current_user
+from app.logging_helper import log_user_activity
+
+router = APIRouter(prefix="/api/cart", tags=["Cart"])
+
+class CartAddEvent(BaseModel):
+    product_id: int
+    quantity: int = Field(1, ge=1, le=1000)
+
+@router.post("/events", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
+async def log_cart_add(
+    event: CartAddEvent,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Record an add-to-cart. The cart itself lives in the browser; this only
+    logs the event (for the conversion funnel) for an existing product.
+    """
+    product = db.query(Product.id, Product.name).filter(Product.id == event.product_id).first()
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+
+    log_user_activity(
+        activity_type=UserActivityType.CART_ADD.value,
+        user_id=current_user.id,
+        resource_type="product",
+        resource_id=product.id,
+        description=f"Added {event.quantity} x {product.name} to cart",
+        details={"quantity": event.quantity}
+    )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile,
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.db_models import Collection
 from app.auth import get_current_admin_user
 import base64
@@ -23,7 +23,7 @@ class CollectionResponse(BaseModel):
         from_attributes = True
 
 @router.get("/", response_model=List[CollectionResponse])
-async def get_all_collections(db: Session = Depends(get_db)):
+async def get_all_collections(db: Session = Depends(get_read_db)):
     """Get all collections"""
     collections = db.query(Collection).all()
 
@@ -46,7 +46,7 @@ async def get_all_collections(db: Session = Depends(get_db)):
     return result
 
 @router.get("/{collection_id}", response_model=CollectionResponse)
-async def get_collection(collection_id: int, db: Session = Depends(get_db)):
+async def get_collection(collection_id: int, db: Session = Depends(get_read_db)):
     """Get a single collection by ID"""
     collection = db.query(Collection).filter(Collection.id == collection_id).first()
     if not collection:
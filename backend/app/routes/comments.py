@@ -5,47 +5,42 @@ from app.database import get_db
 from app.db_models import ProductComment, Product, User, Order, OrderItem
 from app.schemas.comment import CommentCreate, CommentUpdate, CommentResponse, CommentWithProduct
 from app.auth import get_current_user, get_current_admin_user
+from app.services.query_stats import query_budget
 
 router = APIRouter(prefix="/api/comments", tags=["Comments"])
 
-@router.get("/eligible-purchases/{product_id}")
+@router.get("/eligible-purchases/{product_id}", dependencies=[query_budget(3)])
 async def get_eligible_purchases(
     product_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all eligible purchases for reviewing a specific product"""
-    # Get all completed/delivered orders for this user containing this product
-    orders = db.query(Order).filter(
+    # Completed/delivered orders of this user that contain this product, with whether
+    # the user already reviewed this order+product combination (one query)
+    contains_product = db.query(OrderItem.id).filter(
+        OrderItem.order_id == Order.id,
+        OrderItem.product_id == product_id
+    ).exists()
+    has_reviewed = db.query(ProductComment.id).filter(
+        ProductComment.user_id == current_user.id,
+        ProductComment.product_id == product_id,
+        ProductComment.order_id == Order.id
+    ).exists()
+
+    orders = db.query(Order.id, Order.created_at, has_reviewed.label("has_reviewed")).filter(
         Order.user_id == current_user.id,
-        Order.status.in_(['completed', 'delivered'])
+        Order.status.in_(['completed', 'delivered']),
+        contains_product
     ).all()
 
-    eligible_purchases = []
-    for order in orders:
-        # Check if this order contains the product
-        order_item = db.query(OrderItem).filter(
-            OrderItem.order_id == order.id,
-            OrderItem.product_id == product_id
-        ).first()
-
-        if order_item:
-            # Check if user already reviewed this order+product combination
-            existing_review = db.query(ProductComment).filter(
-                ProductComment.user_id == current_user.id,
-                ProductComment.product_id == product_id,
-                ProductComment.order_id == order.id
-            ).first()
-
-            eligible_purchases.append({
-                "order_id": order.id,
-                "purchase_date": order.created_at,
-                "has_reviewed": existing_review is not None
-            })
+    return [{
+        "order_id": order.id,
+        "purchase_date": order.created_at,
+        "has_reviewed": bool(order.has_reviewed)
+    } for order in orders]
 
-    return eligible_purchases
-
-@router.get("/", response_model=List[CommentResponse])
+@router.get("/", response_model=List[CommentResponse], dependencies=[query_budget(2)])
 async def get_comments(
     product_id: Optional[int] = Query(None, description="Filter by product ID"),
     skip: int = Query(0, ge=0),
@@ -53,31 +48,26 @@ async def get_comments(
     db: Session = Depends(get_db)
 ):
     """Get all comments with optional product filter"""
-    query = db.query(ProductComment)
+    # Author and purchase date come from joins instead of a query per comment
+    query = db.query(
+        ProductComment, User.username, User.email, Order.created_at.label("purchase_date")
+    ).outerjoin(User, ProductComment.user_id == User.id).outerjoin(Order, ProductComment.order_id == Order.id)
 
     if product_id:
         query = query.filter(ProductComment.product_id == product_id)
 
-    comments = query.offset(skip).limit(limit).all()
+    rows = query.offset(skip).limit(limit).all()
 
     # Convert to response format with user info
     result = []
-    for comment in comments:
-        user = db.query(User).filter(User.id == comment.user_id).first()
-        order = None
-        purchase_date = None
-        if comment.order_id:
-            order = db.query(Order).filter(Order.id == comment.order_id).first()
-            if order:
-                purchase_date = order.created_at
-
+    for comment, username, user_email, purchase_date in rows:
         comment_dict = {
             "id": comment.id,
             "product_id": comment.product_id,
             "user_id": comment.user_id,
             "order_id": comment.order_id,
-            "username": user.username if user else "Unknown",
-            "user_email": user.email if user else "unknown@example.com",
+            "username": username or "Unknown",
+            "user_email": user_email or "unknown@example.com",
             "rating": comment.rating,
             "comment": comment.comment,
             "created_at": comment.created_at,
@@ -88,7 +78,7 @@ async def get_comments(
 
     return result
 
-@router.get("/admin/all", response_model=List[CommentWithProduct])
+@router.get("/admin/all", response_model=List[CommentWithProduct], dependencies=[query_budget(3)])
 async def get_all_comments_admin(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=100),
@@ -96,22 +86,23 @@ async def get_all_comments_admin(
     db: Session = Depends(get_db)
 ):
     """Get all comments with product info (Admin only)"""
-    comments = db.query(ProductComment).offset(skip).limit(limit).all()
+    rows = db.query(
+        ProductComment, User.username, User.email, Product.name, Product.category
+    ).outerjoin(User, ProductComment.user_id == User.id).outerjoin(
+        Product, ProductComment.product_id == Product.id
+    ).offset(skip).limit(limit).all()
 
     # Convert to response format with user and product info
     result = []
-    for comment in comments:
-        user = db.query(User).filter(User.id == comment.user_id).first()
-        product = db.query(Product).filter(Product.id == comment.product_id).first()
-
+    for comment, username, user_email, product_name, product_category in rows:
         comment_dict = {
             "id": comment.id,
             "product_id": comment.product_id,
-            "product_name": product.name if product else "Unknown",
-            "product_category": product.category.value if product and hasattr(product.category, 'value') else "Unknown",
+            "product_name": product_name or "Unknown",
+            "product_category": (product_category.value if hasattr(product_category, 'value') else product_category) or "Unknown",
             "user_id": comment.user_id,
-            "username": user.username if user else "Unknown",
-            "user_email": user.email if user else "unknown@example.com",
+            "username": username or "Unknown",
+            "user_email": user_email or "unknown@example.com",
             "rating": comment.rating,
             "comment": comment.comment,
             "created_at": comment.created_at,
@@ -1,34 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
-from typing import List, Optional
-from datetime import datetime, timedelta
-from app.database import get_db
-from app.db_models import OrderLog, UserActivityLog, APIRequestLog, User, Order
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from app.database import get_db, get_read_db, open_read_session
+from app.db_models import OrderLog, UserActivityLog, UserActivityType, APIRequestLog, User, Order
 from app.schemas.order_log import OrderLogCreate, OrderLogResponse, OrderLogStats
 from app.schemas.user_activity_log import UserActivityLogCreate, UserActivityLogResponse, UserActivityLogStats
 from app.schemas.api_request_log import APIRequestLogResponse, APIRequestLogStats
-from app.auth import get_current_admin_user
+from app.auth import ALGORITHM, SECRET_KEY, get_current_admin_user
+from app.logging_helper import CLIENT_ORIGIN, VALID_ACTIVITY_TYPES
+from app.search_helper import contains
+from app.services.api_rollups import latency_summary
+from app.services.cache import TTLCache
+from app.services.estimates import approx_count_distinct, estimated_row_count, set_total_count
+from app.services.log_archive import log_archiver
+from app.services.log_export import export_response
+from app.services.log_writer import activity_log_writer
+from dotenv import load_dotenv
+from jose import JWTError, jwt
+import json
+import os
+
+load_dotenv()
 
 router = APIRouter(prefix="/api/logs", tags=["Logs"])
 
+# Stats are shared by all admins and cached briefly; concurrent loads share one computation
+stats_cache = TTLCache("log_stats", ttl=float(os.getenv("LOG_STATS_CACHE_TTL", "30")))
+# Above this many (estimated) rows, distinct counts use HyperLogLog instead of COUNT(DISTINCT)
+EXACT_DISTINCT_MAX_ROWS = int(os.getenv("LOG_STATS_EXACT_DISTINCT_MAX_ROWS", "500000"))
+# Client-side tracking batches; 64 KB is also navigator.sendBeacon's payload limit
+ACTIVITY_BATCH_MAX_EVENTS = int(os.getenv("ACTIVITY_BATCH_MAX_EVENTS", "100"))
+ACTIVITY_BATCH_MAX_BYTES = 64 * 1024
+activity_batch_adapter = TypeAdapter(List[UserActivityLogCreate])
+# Replica routing key of the cached stats reads
+STATS_REPLICA_KEY = "log_stats"
+
+async def _cached_stats(key: Tuple, query):
+    """
+    Cached `query(db)`. It runs with its own session, since concurrent
+    requests share the computation and may outlive the request that started it.
+    """
+    def compute():
+        db = open_read_session(STATS_REPLICA_KEY)
+        try:
+            return query(db)
+        finally:
+            db.close()
+    return await stats_cache.get_or_compute(key, compute)
+
+def _distinct_count(db: Session, column) -> Tuple[int, bool]:
+    """COUNT(DISTINCT column), approximated on large tables; returns (count, approximate)"""
+    if estimated_row_count(db, column.table.name) > EXACT_DISTINCT_MAX_ROWS:
+        return approx_count_distinct(db, column), True
+    return db.query(func.count(func.distinct(column))).filter(column.isnot(None)).scalar() or 0, False
+
 # ==================== ORDER/TRANSACTION LOGS ====================
 
-@router.get("/orders", response_model=List[OrderLogResponse])
-async def get_order_logs(
-    order_id: Optional[int] = Query(None),
-    user_id: Optional[int] = Query(None),
-    action: Optional[str] = Query(None),
-    payment_status: Optional[str] = Query(None),
-    order_status: Optional[str] = Query(None),
-    start_date: Optional[datetime] = Query(None),
-    end_date: Optional[datetime] = Query(None),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, le=100),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+def _order_log_query(
+    db: Session,
+    order_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    order_status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
 ):
-    """Get order logs with optimized pagination (max 100)"""
+    """Filtered order log rows joined with the user, shared by the list and export endpoints"""
     query = db.query(
         OrderLog.id, OrderLog.order_id, OrderLog.user_id, OrderLog.action,
         OrderLog.order_status, OrderLog.payment_status, OrderLog.payment_method,
@@ -51,7 +93,29 @@ async def get_order_logs(
         query = query.filter(OrderLog.created_at >= start_date)
     if end_date:
         query = query.filter(OrderLog.created_at <= end_date)
+    return query
 
+@router.get("/orders", response_model=List[OrderLogResponse])
+async def get_order_logs(
+    response: Response,
+    order_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    action: Optional[str] = Query(None),
+    payment_status: Optional[str] = Query(None),
+    order_status: Optional[str] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, le=100),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get order logs with optimized pagination (max 100)"""
+    query = _order_log_query(
+        db, order_id, user_id, action, payment_status, order_status, start_date, end_date
+    )
+
+    set_total_count(response, db, query)
     results = query.order_by(desc(OrderLog.created_at)).offset(skip).limit(limit).all()
 
     return [OrderLogResponse(
@@ -63,6 +127,26 @@ async def get_order_logs(
         user_email=r.user_email, user_username=r.user_username
     ) for r in results]
 
+@router.get("/orders/export")
+async def export_order_logs(
+    order_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    action: Optional[str] = Query(None),
+    payment_status: Optional[str] = Query(None),
+    order_status: Optional[str] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Gzip the download"),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Stream every matching order log as NDJSON or CSV (Admin only)"""
+    query = _order_log_query(
+        db, order_id, user_id, action, payment_status, order_status, start_date, end_date
+    )
+    return export_response(query.order_by(OrderLog.created_at), "order_logs", format, gzip)
+
 @router.post("/orders", response_model=OrderLogResponse, status_code=status.HTTP_201_CREATED)
 async def create_order_log(
     log_data: OrderLogCreate,
@@ -119,39 +203,42 @@ async def delete_order_log(
 @router.get("/orders/stats", response_model=OrderLogStats)
 async def get_order_stats(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
     """Get order log statistics"""
-    start_date = datetime.utcnow() - timedelta(days=days)
-    total_logs = db.query(func.count(OrderLog.id)).scalar() or 0
-    action_counts = db.query(OrderLog.action, func.count(OrderLog.id)).group_by(OrderLog.action).all()
-    logs_by_action = {str(a): c for a, c in action_counts}
-    recent_activity = db.query(func.count(OrderLog.id)).filter(OrderLog.created_at >= start_date).scalar() or 0
-    total_orders = db.query(func.count(func.distinct(OrderLog.order_id))).scalar() or 0
-
-    return OrderLogStats(
-        total_logs=total_logs, logs_by_action=logs_by_action,
-        recent_activity_count=recent_activity, total_orders_tracked=total_orders
-    )
+    def compute(db: Session):
+        # Totals cover every row, so this reads all partitions; the recent window rides along as a FILTER
+        start_date = datetime.now(timezone.utc) - timedelta(days=days)
+        # One pass: per-action totals and recent counts; overall figures are their sums
+        action_counts = db.query(
+            OrderLog.action,
+            func.count(OrderLog.id),
+            func.count(OrderLog.id).filter(OrderLog.created_at >= start_date)
+        ).group_by(OrderLog.action).all()
+        total_orders, approximate = _distinct_count(db, OrderLog.order_id)
+
+        return OrderLogStats(
+            total_logs=sum(c for _, c, _ in action_counts),
+            logs_by_action={str(a): c for a, c, _ in action_counts},
+            recent_activity_count=sum(r for _, _, r in action_counts),
+            total_orders_tracked=total_orders, approximate=approximate
+        )
+
+    return await _cached_stats(("orders", days), compute)
 
 # ==================== USER ACTIVITY LOGS ====================
 
-@router.get("/activities", response_model=List[UserActivityLogResponse])
-async def get_activity_logs(
-    user_id: Optional[int] = Query(None),
-    activity_type: Optional[str] = Query(None),
-    resource_type: Optional[str] = Query(None),
-    ip_address: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    start_date: Optional[datetime] = Query(None),
-    end_date: Optional[datetime] = Query(None),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, le=100),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+def _activity_log_query(
+    db: Session,
+    user_id: Optional[int] = None,
+    activity_type: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    search: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
 ):
-    """Get user activity logs with optimized pagination (max 100)"""
+    """Filtered activity log rows joined with the user, shared by the list and export endpoints"""
     query = db.query(
         UserActivityLog.id, UserActivityLog.user_id, UserActivityLog.activity_type,
         UserActivityLog.resource_type, UserActivityLog.resource_id,
@@ -167,21 +254,46 @@ async def get_activity_logs(
     if resource_type:
         query = query.filter(UserActivityLog.resource_type == resource_type)
     if ip_address:
-        query = query.filter(UserActivityLog.ip_address.like(f"%{ip_address}%"))
+        query = query.filter(contains(UserActivityLog.ip_address, ip_address))
     if search:
-        # Search across username, activity type, description, and IP
-        search_filter = f"%{search}%"
+        # Search across username, activity type, description, and IP.
+        # Every branch is a condition on user_activity_logs itself (trigram indexes for
+        # description/IP, btree for user_id/activity_type) so they combine in one BitmapOr.
+        matching_users = db.query(User.id).filter(contains(User.username, search))
+        matching_types = [t.value for t in UserActivityType if search.lower() in t.value]
         query = query.filter(
-            (User.username.like(search_filter)) |
-            (UserActivityLog.activity_type.like(search_filter)) |
-            (UserActivityLog.description.like(search_filter)) |
-            (UserActivityLog.ip_address.like(search_filter))
+            UserActivityLog.user_id.in_(matching_users.scalar_subquery()) |
+            UserActivityLog.activity_type.in_(matching_types) |
+            contains(UserActivityLog.description, search) |
+            contains(UserActivityLog.ip_address, search)
         )
     if start_date:
         query = query.filter(UserActivityLog.created_at >= start_date)
     if end_date:
         query = query.filter(UserActivityLog.created_at <= end_date)
+    return query
+
+@router.get("/activities", response_model=List[UserActivityLogResponse])
+async def get_activity_logs(
+    response: Response,
+    user_id: Optional[int] = Query(None),
+    activity_type: Optional[str] = Query(None),
+    resource_type: Optional[str] = Query(None),
+    ip_address: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, le=100),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get user activity logs with optimized pagination (max 100)"""
+    query = _activity_log_query(
+        db, user_id, activity_type, resource_type, ip_address, search, start_date, end_date
+    )
 
+    set_total_count(response, db, query)
     results = query.order_by(desc(UserActivityLog.created_at)).offset(skip).limit(limit).all()
 
     return [UserActivityLogResponse(
@@ -192,6 +304,26 @@ async def get_activity_logs(
         user_email=r.user_email, user_username=r.user_username
     ) for r in results]
 
+@router.get("/activities/export")
+async def export_activity_logs(
+    user_id: Optional[int] = Query(None),
+    activity_type: Optional[str] = Query(None),
+    resource_type: Optional[str] = Query(None),
+    ip_address: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Gzip the download"),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Stream every matching activity log as NDJSON or CSV (Admin only)"""
+    query = _activity_log_query(
+        db, user_id, activity_type, resource_type, ip_address, search, start_date, end_date
+    )
+    return export_response(query.order_by(UserActivityLog.created_at), "activity_logs", format, gzip)
+
 @router.post("/activities", response_model=UserActivityLogResponse, status_code=status.HTTP_201_CREATED)
 async def create_activity_log(
     log_data: UserActivityLogCreate,
@@ -199,21 +331,19 @@ async def create_activity_log(
     db: Session = Depends(get_db)
 ):
     """Create user activity log (public endpoint for client-side tracking)"""
-    from app.db_models import UserActivityType
-
     # Get IP address from request
     ip_address = request.client.host if request.client else None
     user_agent = request.headers.get("user-agent", None)
 
     # Validate activity_type
-    valid_values = [member.value for member in UserActivityType]
-    if log_data.activity_type not in valid_values:
+    if log_data.activity_type not in VALID_ACTIVITY_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid activity type: {log_data.activity_type}. Valid values: {valid_values}"
+            detail=f"Invalid activity type: {log_data.activity_type}. Valid values: {sorted(VALID_ACTIVITY_TYPES)}"
         )
 
     new_log = UserActivityLog(**{k: v for k, v in log_data.dict().items() if v is not None})
+    new_log.details = {**(log_data.details or {}), "origin": CLIENT_ORIGIN}
 
     # Override IP and user agent from request if not provided
     if not new_log.ip_address:
@@ -241,6 +371,83 @@ async def create_activity_log(
         user_email=result.user_email, user_username=result.user_username
     )
 
+async def _read_limited_body(request: Request, limit: int) -> bytes:
+    """Read the request body, rejecting it with 413 as soon as it exceeds `limit` bytes"""
+    too_large = HTTPException(status_code=413, detail="Activity batch too large")
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        if not content_length.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+        if int(content_length) > limit:
+            raise too_large
+
+    # Chunked or mislabelled uploads: count as the body streams in
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def _token_email(request: Request) -> Optional[str]:
+    """Email in the request's bearer token, if it carries a valid one"""
+    authorization = request.headers.get("Authorization")
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        return jwt.decode(authorization[len("Bearer "):], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+@router.post("/activities/batch", status_code=status.HTTP_202_ACCEPTED, response_class=Response)
+async def create_activity_logs_batch(request: Request):
+    """
+    Queue a batch of client-side activity events (public endpoint for client-side tracking).
+
+    The body is a JSON array of events (or {"events": [...]}) and is parsed
+    whatever its content type, so navigator.sendBeacon can post it as
+    text/plain without a CORS preflight. Events with an unknown activity type
+    are skipped; accepted events are written by the batched activity log
+    writer and nothing is echoed back.
+
+    The user comes from the bearer token when there is one (resolved when the
+    batch is written). Beacons cannot send one, so otherwise the events'
+    user_id is used, and the writer clears ids that match no user.
+    """
+    body = await _read_limited_body(request, ACTIVITY_BATCH_MAX_BYTES)
+    try:
+        payload = json.loads(body)
+        if isinstance(payload, dict):
+            payload = payload.get("events", [])
+        events = activity_batch_adapter.validate_python(payload)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Expected a JSON array of activity events")
+    if len(events) > ACTIVITY_BATCH_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {ACTIVITY_BATCH_MAX_EVENTS} events per batch")
+
+    ip_address = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent", None)
+    created_at = datetime.now(timezone.utc)
+    user_email = _token_email(request)
+    for event in events:
+        if event.activity_type not in VALID_ACTIVITY_TYPES:
+            continue
+        activity_log_writer.enqueue({
+            **({"user_email": user_email} if user_email else {"user_id": event.user_id}),
+            "activity_type": event.activity_type,
+            "resource_type": event.resource_type[:50] if event.resource_type else None,
+            "resource_id": event.resource_id,
+            "description": event.description,
+            "details": {**(event.details or {}), "origin": CLIENT_ORIGIN},
+            "ip_address": ip_address,
+            "user_agent": (event.user_agent or user_agent or "")[:500] or None,
+            "sample_weight": 1,
+            "created_at": created_at
+        })
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
 @router.delete("/activities/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_activity_log(
     log_id: int,
@@ -261,43 +468,49 @@ async def delete_activity_log(
 @router.get("/activities/stats", response_model=UserActivityLogStats)
 async def get_activity_stats(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
     """Get user activity statistics"""
-    start_date = datetime.utcnow() - timedelta(days=days)
-    total_activities = db.query(func.count(UserActivityLog.id)).scalar() or 0
-    activity_counts = db.query(UserActivityLog.activity_type, func.count(UserActivityLog.id)).group_by(UserActivityLog.activity_type).all()
-    activities_by_type = {str(a): c for a, c in activity_counts}
-    unique_users = db.query(func.count(func.distinct(UserActivityLog.user_id))).filter(UserActivityLog.user_id.isnot(None)).scalar() or 0
-    recent_activity = db.query(func.count(UserActivityLog.id)).filter(UserActivityLog.created_at >= start_date).scalar() or 0
-
-    return UserActivityLogStats(
-        total_activities=total_activities, activities_by_type=activities_by_type,
-        unique_users=unique_users, recent_activity_count=recent_activity
-    )
+    def compute(db: Session):
+        start_date = datetime.now(timezone.utc) - timedelta(days=days)
+        # Rows are sampled, so counts are sums of sample weights
+        weight = func.sum(UserActivityLog.sample_weight)
+        activity_counts = db.query(
+            UserActivityLog.activity_type,
+            func.coalesce(weight, 0),
+            func.coalesce(weight.filter(UserActivityLog.created_at >= start_date), 0)
+        ).group_by(UserActivityLog.activity_type).all()
+        unique_users, approximate = _distinct_count(db, UserActivityLog.user_id)
+
+        return UserActivityLogStats(
+            total_activities=int(sum(c for _, c, _ in activity_counts)),
+            activities_by_type={str(a): int(c) for a, c, _ in activity_counts},
+            unique_users=unique_users,
+            recent_activity_count=int(sum(r for _, _, r in activity_counts)),
+            approximate=approximate
+        )
+
+    return await _cached_stats(("activities", days), compute)
 
 # ==================== API REQUEST LOGS ====================
 
-@router.get("/api-requests", response_model=List[APIRequestLogResponse])
-async def get_api_request_logs(
-    user_id: Optional[int] = Query(None),
-    method: Optional[str] = Query(None),
-    path: Optional[str] = Query(None),
-    status_code: Optional[int] = Query(None),
-    start_date: Optional[datetime] = Query(None),
-    end_date: Optional[datetime] = Query(None),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, le=100),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+def _api_request_log_query(
+    db: Session,
+    user_id: Optional[int] = None,
+    method: Optional[str] = None,
+    path: Optional[str] = None,
+    route: Optional[str] = None,
+    status_code: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
 ):
-    """Get API request logs with optimized pagination (max 100)"""
+    """Filtered API request log rows joined with the user, shared by the list and export endpoints"""
     query = db.query(
         APIRequestLog.id, APIRequestLog.user_id, APIRequestLog.method,
-        APIRequestLog.path, APIRequestLog.endpoint, APIRequestLog.status_code,
+        APIRequestLog.path, APIRequestLog.route, APIRequestLog.endpoint, APIRequestLog.status_code,
         APIRequestLog.response_time, APIRequestLog.ip_address,
-        APIRequestLog.user_agent, APIRequestLog.query_params, APIRequestLog.created_at,
+        APIRequestLog.user_agent, APIRequestLog.query_params, APIRequestLog.sample_weight,
+        APIRequestLog.created_at,
         User.email.label('user_email'), User.username.label('user_username')
     ).outerjoin(User, APIRequestLog.user_id == User.id)
 
@@ -306,24 +519,68 @@ async def get_api_request_logs(
     if method:
         query = query.filter(APIRequestLog.method == method)
     if path:
-        query = query.filter(APIRequestLog.path.like(f"%{path}%"))
+        query = query.filter(contains(APIRequestLog.path, path))
+    if route:
+        query = query.filter(APIRequestLog.route == route)
     if status_code:
         query = query.filter(APIRequestLog.status_code == status_code)
     if start_date:
         query = query.filter(APIRequestLog.created_at >= start_date)
     if end_date:
         query = query.filter(APIRequestLog.created_at <= end_date)
+    return query
 
+@router.get("/api-requests", response_model=List[APIRequestLogResponse])
+async def get_api_request_logs(
+    response: Response,
+    user_id: Optional[int] = Query(None),
+    method: Optional[str] = Query(None),
+    path: Optional[str] = Query(None),
+    route: Optional[str] = Query(None, description="Exact route template, e.g. /api/products/{product_id}"),
+    status_code: Optional[int] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, le=100),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get API request logs with optimized pagination (max 100)"""
+    query = _api_request_log_query(
+        db, user_id, method, path, route, status_code, start_date, end_date
+    )
+
+    set_total_count(response, db, query)
     results = query.order_by(desc(APIRequestLog.created_at)).offset(skip).limit(limit).all()
 
     return [APIRequestLogResponse(
         id=r.id, user_id=r.user_id, method=r.method,
-        path=r.path, endpoint=r.endpoint, status_code=r.status_code,
+        path=r.path, route=r.route, endpoint=r.endpoint, status_code=r.status_code,
         response_time=r.response_time, ip_address=r.ip_address,
-        user_agent=r.user_agent, query_params=r.query_params,
+        user_agent=r.user_agent, query_params=r.query_params, sample_weight=r.sample_weight,
         created_at=r.created_at, user_email=r.user_email, user_username=r.user_username
     ) for r in results]
 
+@router.get("/api-requests/export")
+async def export_api_request_logs(
+    user_id: Optional[int] = Query(None),
+    method: Optional[str] = Query(None),
+    path: Optional[str] = Query(None),
+    route: Optional[str] = Query(None, description="Exact route template, e.g. /api/products/{product_id}"),
+    status_code: Optional[int] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Gzip the download"),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Stream every matching API request log as NDJSON or CSV (Admin only)"""
+    query = _api_request_log_query(
+        db, user_id, method, path, route, status_code, start_date, end_date
+    )
+    return export_response(query.order_by(APIRequestLog.created_at), "api_request_logs", format, gzip)
+
 @router.delete("/api-requests/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_api_request_log(
     log_id: int,
@@ -344,26 +601,93 @@ async def delete_api_request_log(
 @router.get("/api-requests/stats", response_model=APIRequestLogStats)
 async def get_api_request_stats(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ):
     """Get API request statistics"""
-    start_date = datetime.utcnow() - timedelta(days=days)
-    total_requests = db.query(func.count(APIRequestLog.id)).scalar() or 0
-
-    method_counts = db.query(APIRequestLog.method, func.count(APIRequestLog.id)).group_by(APIRequestLog.method).all()
-    requests_by_method = {str(m): c for m, c in method_counts}
+    def compute(db: Session):
+        start_date = datetime.now(timezone.utc) - timedelta(days=days)
+        # Rows are sampled, so counts are sums of sample weights
+        weight = func.sum(APIRequestLog.sample_weight)
+        timed = APIRequestLog.response_time.isnot(None)
+        # One pass over (method, status): totals, recent counts and the inputs of a weighted mean
+        groups = db.query(
+            APIRequestLog.method, APIRequestLog.status_code,
+            func.coalesce(weight, 0),
+            func.coalesce(weight.filter(APIRequestLog.created_at >= start_date), 0),
+            func.coalesce(func.sum(APIRequestLog.response_time * APIRequestLog.sample_weight).filter(timed), 0),
+            func.coalesce(weight.filter(timed), 0)
+        ).group_by(APIRequestLog.method, APIRequestLog.status_code).all()
+
+        requests_by_method: Dict[str, int] = {}
+        requests_by_status: Dict[str, int] = {}
+        for method, status_code, count, _, _, _ in groups:
+            requests_by_method[str(method)] = requests_by_method.get(str(method), 0) + int(count)
+            requests_by_status[str(status_code)] = requests_by_status.get(str(status_code), 0) + int(count)
+
+        # Weighted mean, so sampled-down fast requests are not under-represented
+        timed_weight = sum(g[5] for g in groups)
+        avg_response_time = sum(g[4] for g in groups) / timed_weight if timed_weight else 0.0
+
+        # Busiest routes by template, so /api/products/1 and /api/products/2 count together
+        route_weight = func.coalesce(weight, 0)
+        route_counts = db.query(APIRequestLog.method, APIRequestLog.route, route_weight).filter(
+            APIRequestLog.route.isnot(None)
+        ).group_by(APIRequestLog.method, APIRequestLog.route).order_by(desc(route_weight)).limit(20).all()
+
+        # Percentiles come from the per-minute rollups, which see every request
+        latency = latency_summary(db, start_date)
+
+        return APIRequestLogStats(
+            total_requests=int(sum(g[2] for g in groups)),
+            requests_by_method=requests_by_method,
+            requests_by_status=requests_by_status,
+            requests_by_route={f"{m} {r}": int(c) for m, r, c in route_counts},
+            avg_response_time=float(avg_response_time),
+            recent_requests_count=int(sum(g[3] for g in groups)),
+            p50_response_time_ms=latency["p50_ms"],
+            p95_response_time_ms=latency["p95_ms"],
+            p99_response_time_ms=latency["p99_ms"]
+        )
 
-    status_counts = db.query(APIRequestLog.status_code, func.count(APIRequestLog.id)).group_by(APIRequestLog.status_code).all()
-    requests_by_status = {str(s): c for s, c in status_counts}
+    return await _cached_stats(("api-requests", days), compute)
 
-    avg_response_time = db.query(func.avg(APIRequestLog.response_time)).scalar() or 0.0
-    recent_requests = db.query(func.count(APIRequestLog.id)).filter(APIRequestLog.created_at >= start_date).scalar() or 0
+@router.get("/api-requests/latency", response_model=Dict)
+async def get_api_request_latency(
+    minutes: int = Query(60, ge=1, le=60 * 24 * 30),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get per-route throughput and p50/p95/p99 latency from the request rollups"""
+    since = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+    summary = latency_summary(db, since, by_route=True)
+    for route in [summary["overall"], *summary["routes"].values()]:
+        route["requests_per_minute"] = round(route["requests"] / minutes, 2)
+
+    return {
+        "minutes": minutes,
+        "overall": summary["overall"],
+        "routes": dict(sorted(summary["routes"].items(), key=lambda item: item[1]["requests"], reverse=True))
+    }
+
+# ==================== ARCHIVED LOGS ====================
+
+@router.get("/archive", response_model=Dict)
+async def get_log_archive_summary(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get archived file, row and byte totals and the covered time range per log table (Admin only)"""
+    return await run_in_threadpool(log_archiver.summary)
 
-    return APIRequestLogStats(
-        total_requests=total_requests,
-        requests_by_method=requests_by_method,
-        requests_by_status=requests_by_status,
-        avg_response_time=float(avg_response_time),
-        recent_requests_count=recent_requests
-    )
+@router.get("/archive/{table}", response_model=Dict)
+async def get_archived_logs(
+    table: str,
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Read archived log rows of one table within a created_at range (Admin only, read-only)"""
+    if table not in log_archiver.tables:
+        raise HTTPException(status_code=404, detail=f"Unknown log table: {table}")
+    return await run_in_threadpool(log_archiver.read, table, start_date, end_date, skip, limit)
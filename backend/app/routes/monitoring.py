@@ -0,0 +1,181 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
+from app.database import get_pool_stats, pool_metrics
+from app.db_models import User
+from app.auth import get_current_admin_user
+from app.services.loop_monitor import loop_monitor
+from app.services.log_writer import api_log_writer, activity_log_writer
+from app.services.log_sampler import log_sampler
+from app.services.memory_tracker import memory_tracker
+from app.services.profiler import request_profiler
+from app.services.query_stats import query_violations, slow_queries
+
+router = APIRouter(prefix="/api/monitoring", tags=["Monitoring"])
+
+# ==================== EVENT LOOP ====================
+
+@router.get("/event-loop", response_model=Dict)
+async def get_event_loop_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get event loop lag and per-route blocking time totals (Admin only)"""
+    return loop_monitor.snapshot()
+
+@router.delete("/event-loop", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_event_loop_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Reset event loop lag statistics (Admin only)"""
+    loop_monitor.reset()
+
+# ==================== DATABASE POOL ====================
+
+@router.get("/db-pool", response_model=Dict)
+async def get_db_pool_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get connection pool usage, overflow and checkout wait times (Admin only)"""
+    return get_pool_stats()
+
+@router.delete("/db-pool", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_db_pool_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Reset connection pool counters (Admin only)"""
+    pool_metrics.reset()
+
+# ==================== SQL QUERIES ====================
+
+@router.get("/slow-queries", response_model=Dict)
+async def get_slow_queries(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get recent statements slower than SLOW_QUERY_MS, slowest first, with parameters and plans (Admin only)"""
+    return slow_queries.snapshot()
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_slow_queries(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Clear the slow-query log (Admin only)"""
+    slow_queries.reset()
+
+@router.get("/query-violations", response_model=Dict)
+async def get_query_violations(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get recent requests over their query budget or with repeated statements (N+1), newest first (Admin only)"""
+    return query_violations.snapshot()
+
+@router.delete("/query-violations", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_query_violations(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Clear the query violation log (Admin only)"""
+    query_violations.reset()
+
+# ==================== PROFILER ====================
+
+@router.get("/profiler", response_model=Dict)
+async def get_profiler_status(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get profiler state and the stored request profiles, newest first (Admin only)"""
+    return request_profiler.snapshot()
+
+@router.post("/profiler", response_model=Dict)
+async def arm_profiler(
+    path: str = Query(..., description="Profile requests whose path starts with this, e.g. /api/products/"),
+    count: int = Query(1, ge=1, le=50, description="Number of requests to profile"),
+    method: Optional[str] = Query(None, description="Only this HTTP method"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Sampling interval"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Profile the next `count` matching requests with the sampling profiler (Admin only)"""
+    request_profiler.arm(path, count, method, interval_ms)
+    return request_profiler.snapshot()
+
+@router.delete("/profiler", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_profiler(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Disarm the profiler and drop stored profiles (Admin only)"""
+    request_profiler.disarm()
+    request_profiler.clear()
+
+@router.get("/profiler/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$", description="speedscope JSON or collapsed stacks"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Download a request profile for speedscope.app or flamegraph tools (Admin only)"""
+    profile = request_profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "collapsed":
+        content, media_type, extension = profile.collapsed(), "text/plain", "txt"
+    else:
+        content, media_type, extension = profile.speedscope(), "application/json", "speedscope.json"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=profile_{profile.id}.{extension}"}
+    )
+
+# ==================== MEMORY ====================
+
+@router.get("/memory", response_model=Dict)
+async def get_memory_stats(
+    limit: int = Query(25, ge=1, le=200, description="Number of allocation sites"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get process memory, top live allocation sites and per-route peak allocations (Admin only)"""
+    # Taking a tracemalloc snapshot can take a while on a big heap
+    return await run_in_threadpool(memory_tracker.snapshot, limit, group_by)
+
+@router.post("/memory/start", response_model=Dict)
+async def start_memory_tracing(
+    frames: int = Query(1, ge=1, le=50, description="Traceback frames kept per allocation"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Start tracemalloc tracing on this worker (Admin only)"""
+    memory_tracker.start(frames)
+    return {"enabled": memory_tracker.enabled, "frames": memory_tracker.frames}
+
+@router.post("/memory/stop", response_model=Dict)
+async def stop_memory_tracing(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Stop tracemalloc tracing on this worker; per-route stats are kept (Admin only)"""
+    memory_tracker.stop()
+    return {"enabled": memory_tracker.enabled}
+
+@router.delete("/memory", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_memory_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Reset per-route peak allocation stats (Admin only)"""
+    memory_tracker.reset()
+
+# ==================== LOG WRITERS ====================
+
+@router.get("/log-writers", response_model=Dict)
+async def get_log_writer_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get queue depth, throughput and drop counters of the batched log writers (Admin only)"""
+    return {
+        "api_request_logs": api_log_writer.stats(),
+        "user_activity_logs": activity_log_writer.stats()
+    }
+
+@router.get("/log-sampling", response_model=Dict)
+async def get_log_sampling_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get log sampling rules and per-route seen/kept counts (Admin only)"""
+    return log_sampler.stats()
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
@@ -9,6 +9,10 @@ from app.db_models import Order, OrderItem, Product, User, OrderStatus, LogActio
 from app.auth import get_current_user, get_current_admin_user
 from app.services.email_service import email_service
 from app.services.pdf_service import pdf_service
+from app.services.estimates import set_total_count
+from app.services.query_stats import query_budget
+from app.services.sales_rollup import record_order_created, record_status_change
+from app.services.analytics_cache import invalidate_order_analytics
 from app.logging_helper import log_order_event, log_user_activity
 import stripe
 import os
@@ -123,7 +127,9 @@ async def stripe_webhook(
                     )
                     db.add(order_item)
 
+            record_order_created(db, new_order)
             db.commit()
+            invalidate_order_analytics()
 
             # Log order creation
             log_order_event(
@@ -140,7 +146,6 @@ async def stripe_webhook(
 
             # Log user activity
             log_user_activity(
-                db=db,
                 activity_type=UserActivityType.CHECKOUT_COMPLETE.value,
                 user_id=int(user_id),
                 resource_type="order",
@@ -152,7 +157,7 @@ async def stripe_webhook(
     return {"status": "success"}
 
 # Get user's orders
-@router.get("/my-orders", response_model=List[OrderResponse])
+@router.get("/my-orders", response_model=List[OrderResponse], dependencies=[query_budget(4)])
 async def get_my_orders(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -161,7 +166,7 @@ async def get_my_orders(
     orders = db.query(Order).filter(
         Order.user_id == current_user.id
     ).options(
-        joinedload(Order.items).joinedload(OrderItem.product)
+        joinedload(Order.items).joinedload(OrderItem.product).selectinload(Product.images)
     ).order_by(Order.created_at.desc()).all()
 
     result = []
@@ -211,7 +216,7 @@ async def get_my_orders(
     return result
 
 # Get single order (user must own it)
-@router.get("/{order_id}", response_model=OrderResponse)
+@router.get("/{order_id}", response_model=OrderResponse, dependencies=[query_budget(4)])
 async def get_order(
     order_id: int,
     current_user: User = Depends(get_current_user),
@@ -222,7 +227,7 @@ async def get_order(
         Order.id == order_id,
         Order.user_id == current_user.id
     ).options(
-        joinedload(Order.items).joinedload(OrderItem.product)
+        joinedload(Order.items).joinedload(OrderItem.product).selectinload(Product.images)
     ).first()
 
     if not order:
@@ -274,8 +279,9 @@ async def get_order(
     )
 
 # Admin: Get all orders
-@router.get("/admin/all", response_model=List[OrderResponse])
+@router.get("/admin/all", response_model=List[OrderResponse], dependencies=[query_budget(5)])
 async def get_all_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
@@ -283,14 +289,17 @@ async def get_all_orders(
     db: Session = Depends(get_db)
 ):
     """Get all orders (Admin only)"""
-    query = db.query(Order).options(
-        joinedload(Order.items).joinedload(OrderItem.product)
-    )
+    query = db.query(Order)
 
     if status_filter:
         query = query.filter(Order.status == status_filter)
 
-    orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    # Total from the filtered query before the eager loads are added
+    set_total_count(response, db, query)
+
+    orders = query.options(
+        joinedload(Order.items).joinedload(OrderItem.product).selectinload(Product.images)
+    ).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
 
     result = []
     for order in orders:
@@ -346,9 +355,11 @@ async def update_order_status(
     db: Session = Depends(get_db)
 ):
     """Update order status (Admin only)"""
+    # Row lock until commit, so concurrent transitions see each other's status
+    # and the sales rollup is adjusted once (of=Order: the items are outer joined)
     order = db.query(Order).filter(Order.id == order_id).options(
         joinedload(Order.items)
-    ).first()
+    ).with_for_update(of=Order).first()
 
     if not order:
         raise HTTPException(
@@ -359,9 +370,12 @@ async def update_order_status(
     # Get the user who owns this order
     user = db.query(User).filter(User.id == order.user_id).first()
 
-    # Update order status
+    # Update order status (and the daily sales rollup in the same transaction)
+    previous_status = order.status
     order.status = status_update.status
+    record_status_change(db, order, previous_status)
     db.commit()
+    invalidate_order_analytics()
 
     # Send status update email
     if user:
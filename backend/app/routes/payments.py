@@ -4,10 +4,14 @@ from sqlalchemy import func
 from typing import List
 from pydantic import BaseModel
 from app.database import get_db
-from app.db_models import Product, User, Address, OrderItem
+from app.db_models import Product, User, Address, OrderItem, UserActivityType
 from app.auth import get_current_user
 from app.services.email_service import email_service
 from app.services.stripe_service import stripe_service
+from app.services.metrics import external_call
+from app.services.sales_rollup import record_order_created
+from app.services.analytics_cache import invalidate_order_analytics
+from app.logging_helper import log_user_activity
 import stripe
 import os
 from dotenv import load_dotenv
@@ -263,7 +267,16 @@ async def create_checkout_session(
                 "allowed_countries": ["US", "CA", "GB", "AU", "ID", "SG", "MY", "TH", "PH", "VN"],
             }
 
-        checkout_session = stripe.checkout.Session.create(**session_params)
+        with external_call("stripe", "checkout.Session.create"):
+            checkout_session = stripe.checkout.Session.create(**session_params)
+
+        # Log checkout start (products listed for the conversion funnel)
+        log_user_activity(
+            activity_type=UserActivityType.CHECKOUT_START.value,
+            user_id=current_user.id,
+            description=f"Started checkout with {len(checkout_request.items)} item(s)",
+            details={"product_ids": [item.product_id for item in checkout_request.items], "session_id": checkout_session.id}
+        )
 
         return {
             "checkout_url": checkout_session.url,
@@ -290,7 +303,8 @@ async def get_session_status(
     """Get the status of a checkout session and create order if paid"""
     try:
         print(f"[DEBUG] Retrieving session: {session_id}")
-        session = stripe.checkout.Session.retrieve(session_id)
+        with external_call("stripe", "checkout.Session.retrieve"):
+            session = stripe.checkout.Session.retrieve(session_id)
         print(f"[DEBUG] Session payment status: {session.payment_status}")
 
         # If payment is successful and order doesn't exist yet, create it
@@ -370,9 +384,21 @@ async def get_session_status(
                             )
                             db.add(order_item)
 
+                    record_order_created(db, new_order)
                     db.commit()
+                    invalidate_order_analytics()
                     print(f"[DEBUG] Order committed successfully!")
 
+                    # Log user activity
+                    log_user_activity(
+                        activity_type=UserActivityType.CHECKOUT_COMPLETE.value,
+                        user_id=current_user.id,
+                        resource_type="order",
+                        resource_id=new_order.id,
+                        description=f"Completed checkout for order #{new_order.id}",
+                        details={"total_amount": total_amount, "payment_method": "stripe"}
+                    )
+
                     # Send receipt email
                     try:
                         # Prepare order data for email
@@ -3,7 +3,7 @@ from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.db_models import Product, ProductImage, ProductVariant, User, Order, OrderItem, OrderStatus, UserActivityType, UserRole
 from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
 from app.auth import get_current_user, get_current_admin_user
@@ -154,7 +154,7 @@ def calculate_available_stock(product: Product, db: Session) -> int:
 @router.get("/{product_id}/image")
 async def get_product_image(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get product image as binary data"""
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -178,7 +178,7 @@ async def get_product_image(
 @router.get("/media/{media_id}")
 async def get_media_file(
     media_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get media file (video/GIF) as binary data - optimized for large files"""
     media = db.query(ProductImage).filter(ProductImage.id == media_id).first()
@@ -211,7 +211,7 @@ async def get_products(
     search: Optional[str] = Query(None, description="Search in name or description"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all products with optional filtering"""
     # Check if user is admin
@@ -305,7 +305,7 @@ async def get_product(
     product_id: int,
     request: Request,
     color: Optional[str] = Query(None, description="Filter images by color"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a single product by ID, optionally filtered by color"""
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -340,7 +340,6 @@ async def get_product(
     # Log the product view
     try:
         log_user_activity(
-            db=db,
             activity_type=UserActivityType.PRODUCT_VIEW.value,
             user_id=user_id,
             resource_type="product",
@@ -826,14 +825,14 @@ async def delete_product(
     return None
 
 @router.get("/categories/list", response_model=List[str])
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: Session = Depends(get_read_db)):
     """Get list of unique product categories from database"""
     # Get distinct categories from the products table
     categories = db.query(Product.category).distinct().all()
     return [cat[0] for cat in categories if cat[0]]  # Return list of category strings
 
 @router.get("/collections/list", response_model=List[str])
-async def get_collections(db: Session = Depends(get_db)):
+async def get_collections(db: Session = Depends(get_read_db)):
     """Get list of unique product collections from database"""
     # Get distinct collections from the products table
     collections = db.query(Product.collection).distinct().filter(
@@ -846,7 +845,7 @@ async def get_collections(db: Session = Depends(get_db)):
 async def get_bestsellers(
     request: Request,
     limit: int = Query(6, le=20, description="Number of bestsellers to return"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get bestseller products based on completed orders (successful payments)"""
     # Query to get products ordered by total quantity sold in completed orders
@@ -917,7 +916,7 @@ async def get_bestsellers(
 async def get_new_arrivals(
     request: Request,
     limit: int = Query(6, le=20, description="Number of new arrivals to return"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get new arrival products (sorted by creation date)"""
     products = db.query(Product).order_by(Product.created_at.desc()).limit(limit).all()
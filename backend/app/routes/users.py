@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -6,12 +6,15 @@ from app.database import get_db
 from app.db_models import User, DeletionType
 from app.schemas.user import UserResponse, UserUpdate, UserCreate
 from app.auth import get_current_admin_user, get_current_user, get_password_hash
+from app.search_helper import contains
+from app.services.estimates import set_total_count
 from app.services.email_service import email_service
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     role: Optional[str] = Query(None, description="Filter by role (admin/user)"),
     status_filter: Optional[str] = Query(None, alias="status", description="Filter by status"),
     search: Optional[str] = Query(None, description="Search by username or email"),
@@ -35,11 +38,10 @@ async def get_users(
         query = query.filter(User.status == status_filter)
 
     if search:
-        query = query.filter(
-            (User.username.ilike(f"%{search}%")) |
-            (User.email.ilike(f"%{search}%"))
-        )
+        # Both columns have trigram indexes, so this is a BitmapOr rather than a scan
+        query = query.filter(contains(User.username, search) | contains(User.email, search))
 
+    set_total_count(response, db, query)
     users = query.offset(skip).limit(limit).all()
     return users
 
@@ -0,0 +1,123 @@
+"""
+Schema upgrades
+Base.metadata.create_all() only creates missing tables. These idempotent
+statements bring existing PostgreSQL databases in line with db_models.py.
+"""
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+# Applied in order on every startup, so each statement must be idempotent
+UPGRADES = [
+    # Log sampling weights
+    "ALTER TABLE api_request_logs ADD COLUMN IF NOT EXISTS sample_weight INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE user_activity_logs ADD COLUMN IF NOT EXISTS sample_weight INTEGER NOT NULL DEFAULT 1",
+    # Route templates for request logs (existing rows: scripts/backfill_route_templates.py)
+    "ALTER TABLE api_request_logs ADD COLUMN IF NOT EXISTS route VARCHAR(500)",
+    "CREATE INDEX IF NOT EXISTS ix_api_request_logs_route ON api_request_logs (route)",
+]
+
+# pg_trgm GIN indexes backing substring search (ILIKE '%term%'), name -> (table, column)
+TRIGRAM_INDEXES = {
+    "ix_user_activity_logs_ip_address_trgm": ("user_activity_logs", "ip_address"),
+    "ix_user_activity_logs_description_trgm": ("user_activity_logs", "description"),
+    "ix_api_request_logs_path_trgm": ("api_request_logs", "path"),
+    "ix_users_username_trgm": ("users", "username"),
+    "ix_users_email_trgm": ("users", "email"),
+}
+
+def trigram_available(conn: Connection) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+def create_trigram_indexes(conn: Connection, table: str):
+    """
+    Create a table's trigram indexes inside the caller's transaction, if
+    pg_trgm is installed. Only for tables that are new or still empty (e.g. a
+    log table being converted to partitions); existing tables are indexed
+    online by build_trigram_indexes().
+    """
+    if not trigram_available(conn):
+        return
+    for name, (index_table, column) in TRIGRAM_INDEXES.items():
+        if index_table == table:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {index_table} USING gin ({column} gin_trgm_ops)"
+            ))
+
+def _index_state(conn: Connection, name: str) -> Optional[bool]:
+    """None if the index does not exist, else whether it is valid (a failed concurrent build leaves it invalid)"""
+    row = conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+    ), {"name": name}).first()
+    return None if row is None else row[0]
+
+def _partitions(conn: Connection, table: str) -> List[str]:
+    return [name for (name,) in conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+    ), {"table": table}).all()]
+
+def build_trigram_indexes(engine: Engine) -> Dict[str, str]:
+    """
+    Build the missing trigram indexes without blocking writes.
+
+    Uses CREATE INDEX CONCURRENTLY, which cannot run in a transaction, so
+    every statement autocommits. Invalid leftovers of an interrupted build
+    are dropped and rebuilt. A partitioned table gets its index per
+    partition, each built concurrently and then attached to a parent index
+    created ON ONLY the parent (partitions created later get the index
+    automatically). Returns index name -> what was done.
+    """
+    report = {}
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for name, (table, column) in TRIGRAM_INDEXES.items():
+            state = _index_state(conn, name)
+            if state:
+                report[name] = "exists"
+                continue
+
+            partitions = _partitions(conn, table)
+            if not partitions:
+                if state is False:
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                conn.execute(text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"
+                ))
+                report[name] = "created"
+                continue
+
+            # Stays invalid until every partition's index is attached
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} USING gin ({column} gin_trgm_ops)"
+            ))
+            for partition in partitions:
+                partition_index = f"{partition}_{column}_trgm"[:63]
+                partition_state = _index_state(conn, partition_index)
+                if partition_state is False:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{partition_index}"'))
+                if not partition_state:
+                    conn.execute(text(
+                        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{partition_index}" '
+                        f'ON "{partition}" USING gin ({column} gin_trgm_ops)'
+                    ))
+                attached = conn.execute(text(
+                    "SELECT 1 FROM pg_inherits WHERE inhrelid = CAST(:child AS regclass) "
+                    "AND inhparent = CAST(:parent AS regclass)"
+                ), {"child": f'"{partition_index}"', "parent": name}).first()
+                if attached is None:
+                    conn.execute(text(f'ALTER INDEX {name} ATTACH PARTITION "{partition_index}"'))
+            report[name] = f"created on {len(partitions)} partitions"
+    return report
+
+def upgrade_schema(engine: Engine):
+    """Apply schema upgrades (PostgreSQL only)"""
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        for statement in UPGRADES:
+            conn.execute(text(statement))
+
+    # Trigram indexes are not built here: on large tables the build would block
+    # writes and startup. Run scripts/create_trigram_indexes.py once instead.
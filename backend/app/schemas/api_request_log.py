@@ -7,12 +7,14 @@ class APIRequestLogResponse(BaseModel):
     user_id: Optional[int]
     method: str
     path: str
+    route: Optional[str] = None
     endpoint: Optional[str]
     status_code: Optional[int]
     response_time: Optional[float]
     ip_address: Optional[str]
     user_agent: Optional[str]
     query_params: Optional[Dict[str, Any]]
+    sample_weight: int = 1
     created_at: datetime
 
     # Populated from relationships
@@ -26,5 +28,10 @@ class APIRequestLogStats(BaseModel):
     total_requests: int
     requests_by_method: Dict[str, int]
     requests_by_status: Dict[str, int]
+    requests_by_route: Dict[str, int] = {}  # Top routes, "METHOD /route/template"
     avg_response_time: float
     recent_requests_count: int
+    # From per-minute rollups over the same window
+    p50_response_time_ms: Optional[float] = None
+    p95_response_time_ms: Optional[float] = None
+    p99_response_time_ms: Optional[float] = None
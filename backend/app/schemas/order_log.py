@@ -55,3 +55,4 @@ class OrderLogStats(BaseModel):
     logs_by_action: Dict[str, int]
     recent_activity_count: int
     total_orders_tracked: int
+    approximate: bool = False  # Distinct count is a HyperLogLog estimate (large tables)
@@ -36,3 +36,4 @@ class UserActivityLogStats(BaseModel):
     activities_by_type: Dict[str, int]
     unique_users: int
     recent_activity_count: int
+    approximate: bool = False  # Distinct count is a HyperLogLog estimate (large tables)
@@ -0,0 +1,16 @@
+"""
+Substring search helpers
+
+Substring filters are written as ILIKE '%term%' so PostgreSQL can answer them
+from the pg_trgm GIN indexes built by scripts/create_trigram_indexes.py (terms of 3+ characters).
+"""
+from sqlalchemy.sql.elements import ColumnElement
+
+def like_pattern(term: str) -> str:
+    """'%term%' with LIKE wildcards in the term escaped"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def contains(column, term: str) -> ColumnElement:
+    """Case-insensitive substring match that can use a trigram index on `column`"""
+    return column.ilike(like_pattern(term), escape="\\")
@@ -0,0 +1,52 @@
+"""
+Analytics Cache
+Shared result cache for the admin analytics endpoints, invalidated when orders change
+"""
+import os
+from typing import Any, Callable, Hashable, Optional
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+from app.database import open_read_session, replica_router
+from app.services.cache import TTLCache
+
+load_dotenv()
+
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+ANALYTICS_CACHE_STALE_TTL = float(os.getenv("ANALYTICS_CACHE_STALE_TTL", "300"))
+ANALYTICS_TRENDING_CACHE_TTL = float(os.getenv("ANALYTICS_TRENDING_CACHE_TTL", "300"))
+
+# Replica routing key of analytics reads; pinned to the primary after order changes
+REPLICA_KEY = "analytics"
+
+# First element of the cache keys built from order data
+ORDER_KEYS = {"dashboard", "sales", "sales_monthly", "sales_by_category"}
+
+# Keys are tuples whose first element names the endpoint, e.g. ("sales", "month")
+analytics_cache = TTLCache("analytics", ttl=ANALYTICS_CACHE_TTL, stale_ttl=ANALYTICS_CACHE_STALE_TTL)
+
+def with_read_session(query: Callable[[Session], Any]) -> Callable[[], Any]:
+    """
+    Wrap `query(db)` into a compute function with its own session, as cached
+    computations may be refreshed in the background after the request ended.
+    """
+    def compute():
+        db = open_read_session(REPLICA_KEY)
+        try:
+            return query(db)
+        finally:
+            db.close()
+    return compute
+
+async def cached(key: Hashable, query: Callable[[Session], Any],
+                 ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> Any:
+    return await analytics_cache.get_or_compute(key, with_read_session(query), ttl, stale_ttl)
+
+def invalidate_order_analytics():
+    """
+    Call after committing an order change. Sales charts are dropped so the
+    next view recomputes them; the dashboard is served stale once while it
+    refreshes. Reads stay on the primary until the replica has the change.
+    """
+    replica_router.mark_write(REPLICA_KEY)
+    analytics_cache.invalidate_where(lambda key: key[0] == "dashboard", keep_stale=True)
+    analytics_cache.invalidate_where(lambda key: key[0] in ORDER_KEYS and key[0] != "dashboard")
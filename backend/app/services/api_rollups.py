@@ -0,0 +1,277 @@
+"""
+API Request Rollups
+Per-minute throughput and latency rollups with mergeable percentile sketches
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+from app.db_models import APIRequestRollup
+
+load_dotenv()
+
+# Relative accuracy of the latency sketch (1% -> bucket bounds grow by ~2%)
+SKETCH_ACCURACY = 0.01
+GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Cap on distinct (route, method, status class) keys per minute
+MAX_KEYS_PER_MINUTE = 1000
+
+# Unwritten minutes kept in memory while the database is unavailable; older ones are dropped
+MAX_BACKLOG_MINUTES = 180
+
+# pg_try_advisory_xact_lock key held while compacting (arbitrary, unique to this job)
+COMPACTION_LOCK_KEY = 4107330871
+
+# Rows older than `age` are merged into one row per `resolution` bucket and key, so
+# wide windows read a few hundred rows per key instead of one per minute.
+# `lookback` is how far behind `age` each hourly compaction pass looks.
+COMPACTION_LEVELS = [
+    (timedelta(hours=2), "hour", timedelta(days=1)),
+    (timedelta(days=7), "day", timedelta(days=3)),
+]
+
+def _truncate(value: datetime, resolution: str) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if resolution == "day" else value
+
+class LatencySketch:
+    """
+    Log-bucketed latency histogram (HDR/DDSketch style).
+
+    Each millisecond value goes into bucket ceil(log_gamma(value)), so any
+    quantile is returned within SKETCH_ACCURACY relative error. Sketches merge
+    by adding bucket counts, which makes per-minute, per-worker rows safe to
+    combine into any wider window.
+    """
+
+    def __init__(self, buckets: Optional[Dict[str, int]] = None):
+        self.buckets: Dict[int, int] = {int(k): v for k, v in (buckets or {}).items()}
+
+    def add(self, value_ms: float, count: int = 1):
+        index = math.ceil(math.log(max(value_ms, 0.001)) / LOG_GAMMA)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "LatencySketch"):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i]
+                return 2 * GAMMA ** index / (GAMMA + 1)
+        return 2 * GAMMA ** max(self.buckets) / (GAMMA + 1)
+
+    def to_json(self) -> Dict[str, int]:
+        return {str(k): v for k, v in self.buckets.items()}
+
+class RollupAggregator:
+    """
+    Aggregates every API request (before log sampling) in memory by
+    (minute, route template, method, status class). The API log writer thread
+    flushes completed minutes to api_request_rollups. Each worker writes its
+    own rows; readers merge them.
+    """
+
+    def __init__(self):
+        self.retention_days = int(os.getenv("API_ROLLUP_RETENTION_DAYS", "90"))
+        self._lock = threading.Lock()
+        self._minutes: Dict[datetime, Dict[Tuple[str, str, str], Dict]] = {}
+        self._last_cleanup = float("-inf")  # Never run
+        self.dropped = 0
+
+    def record(self, route: str, method: str, status_code: int, response_time: float):
+        minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        key = (route[:500], method, f"{status_code // 100}xx")
+        with self._lock:
+            buckets = self._minutes.setdefault(minute, {})
+            entry = buckets.get(key)
+            if entry is None:
+                if len(buckets) >= MAX_KEYS_PER_MINUTE:
+                    self.dropped += 1
+                    return
+                entry = buckets[key] = {"count": 0, "total": 0.0, "max": 0.0, "sketch": LatencySketch()}
+            entry["count"] += 1
+            entry["total"] += response_time
+            entry["max"] = max(entry["max"], response_time)
+            entry["sketch"].add(response_time * 1000)
+
+    def _cleanup_due(self) -> bool:
+        return self.retention_days > 0 and time.monotonic() - self._last_cleanup > 3600
+
+    def due(self, final: bool = False) -> bool:
+        """Whether a flush has anything to do (lets the writer skip opening a session)"""
+        current = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        with self._lock:
+            ready = any(final or m < current for m in self._minutes)
+        return ready or self._cleanup_due()
+
+    def drain(self, final: bool = False) -> Dict[datetime, Dict[Tuple[str, str, str], Dict]]:
+        """Take completed minutes (or everything, when final)"""
+        current = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        with self._lock:
+            ready = [m for m in self._minutes if final or m < current]
+            return {m: self._minutes.pop(m) for m in ready}
+
+    def restore(self, taken: Dict[datetime, Dict[Tuple[str, str, str], Dict]]):
+        """Merge drained minutes back after a failed write, keeping the newest MAX_BACKLOG_MINUTES"""
+        with self._lock:
+            for minute, buckets in taken.items():
+                current = self._minutes.setdefault(minute, {})
+                for key, entry in buckets.items():
+                    existing = current.get(key)
+                    if existing is None:
+                        current[key] = entry
+                        continue
+                    existing["count"] += entry["count"]
+                    existing["total"] += entry["total"]
+                    existing["max"] = max(existing["max"], entry["max"])
+                    existing["sketch"].merge(entry["sketch"])
+            overflow = sorted(self._minutes)[:-MAX_BACKLOG_MINUTES]
+            for minute in overflow:
+                self.dropped += sum(entry["count"] for entry in self._minutes.pop(minute).values())
+        if overflow:
+            print(f"API rollups: dropped {len(overflow)} unwritten minutes (backlog over {MAX_BACKLOG_MINUTES})")
+
+    def flush(self, db: Session, final: bool = False) -> int:
+        """Insert completed minutes and commit, then (about once an hour) compact and expire old rows"""
+        taken = self.drain(final)
+        rows = [
+            {
+                "minute": minute, "route": route, "method": method, "status_class": status_class,
+                "request_count": entry["count"], "total_time": entry["total"],
+                "max_time": entry["max"], "sketch": entry["sketch"].to_json()
+            }
+            for minute, buckets in taken.items()
+            for (route, method, status_class), entry in buckets.items()
+        ]
+        if rows:
+            try:
+                db.execute(insert(APIRequestRollup), rows)
+                db.commit()
+            except Exception:
+                # Raw logs are sampled, so these counts exist nowhere else: keep them for the next flush
+                db.rollback()
+                if final:
+                    print(f"API rollups: lost {len(taken)} unwritten minutes on shutdown")
+                else:
+                    self.restore(taken)
+                raise
+
+        # Separate transaction, so a failed compaction cannot roll back the minutes above
+        if self._cleanup_due():
+            self._last_cleanup = time.monotonic()
+            try:
+                if self._try_compaction_lock(db):
+                    self.compact(db)
+                    cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+                    db.query(APIRequestRollup).filter(APIRequestRollup.minute < cutoff)\
+                        .delete(synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                print(f"API rollup compaction failed: {e}")
+                db.rollback()
+        return len(rows)
+
+    def _try_compaction_lock(self, db: Session) -> bool:
+        """Transaction-level advisory lock, so one worker compacts at a time and the others skip"""
+        if db.get_bind().dialect.name != "postgresql":
+            return True
+        return bool(db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": COMPACTION_LOCK_KEY}).scalar())
+
+    def compact(self, db: Session, now: Optional[datetime] = None):
+        """Merge old per-minute rows into hourly, then daily, rows (sketches merge exactly)"""
+        now = now or datetime.now(timezone.utc)
+        for age, resolution, lookback in COMPACTION_LEVELS:
+            end = _truncate(now - age, resolution)
+            # Lock the rows (in id order, so lockers cannot deadlock) so nothing merges them twice
+            rows = db.query(APIRequestRollup).filter(
+                APIRequestRollup.minute >= end - lookback, APIRequestRollup.minute < end
+            ).order_by(APIRequestRollup.id).with_for_update().all()
+
+            groups: Dict[Tuple, List[APIRequestRollup]] = {}
+            for row in rows:
+                key = (_truncate(row.minute, resolution), row.route, row.method, row.status_class)
+                groups.setdefault(key, []).append(row)
+
+            for (bucket, route, method, status_class), members in groups.items():
+                if len(members) == 1 and members[0].minute == bucket:
+                    continue
+                sketch = LatencySketch()
+                for member in members:
+                    sketch.merge(LatencySketch(member.sketch))
+                    db.delete(member)
+                db.add(APIRequestRollup(
+                    minute=bucket, route=route, method=method, status_class=status_class,
+                    request_count=sum(m.request_count for m in members),
+                    total_time=sum(m.total_time for m in members),
+                    max_time=max(m.max_time for m in members),
+                    sketch=sketch.to_json()
+                ))
+            db.flush()
+
+def latency_summary(db: Session, since: datetime, by_route: bool = False) -> Dict:
+    """
+    Merge rollups since a point in time into request counts, mean and p50/p95/p99 (ms).
+    With by_route, returns {"overall": ..., "routes": {"METHOD /template": ...}}.
+    """
+    rows = db.query(
+        APIRequestRollup.route, APIRequestRollup.method, APIRequestRollup.status_class,
+        APIRequestRollup.request_count, APIRequestRollup.total_time,
+        APIRequestRollup.max_time, APIRequestRollup.sketch
+    ).filter(APIRequestRollup.minute >= since).all()
+
+    overall = _empty_group()
+    routes: Dict[str, Dict] = {}
+    for route, method, status_class, count, total, max_time, buckets in rows:
+        sketch = LatencySketch(buckets)
+        groups = [overall, routes.setdefault(f"{method} {route}", _empty_group())] if by_route else [overall]
+        for group in groups:
+            group["count"] += count
+            group["total"] += total
+            group["max"] = max(group["max"], max_time or 0.0)
+            if status_class in ("4xx", "5xx"):
+                group["errors"] += count
+            group["sketch"].merge(sketch)
+
+    if not by_route:
+        return _summarize(overall)
+    return {"overall": _summarize(overall), "routes": {key: _summarize(group) for key, group in routes.items()}}
+
+def _summarize(group: Dict) -> Dict:
+    sketch = group["sketch"]
+    return {
+        "requests": group["count"],
+        "errors": group["errors"],
+        "avg_ms": round(group["total"] / group["count"] * 1000, 2) if group["count"] else None,
+        "max_ms": round(group["max"] * 1000, 2),
+        "p50_ms": _round(sketch.quantile(0.50)),
+        "p95_ms": _round(sketch.quantile(0.95)),
+        "p99_ms": _round(sketch.quantile(0.99)),
+    }
+
+def _empty_group() -> Dict:
+    return {"count": 0, "errors": 0, "total": 0.0, "max": 0.0, "sketch": LatencySketch()}
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+# Create singleton instance
+api_rollups = RollupAggregator()
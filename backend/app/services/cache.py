@@ -0,0 +1,121 @@
+"""
+In-process TTL Cache
+Short-lived result caching with single-flight and stale-while-revalidate for expensive read endpoints
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.services.metrics import record_cache
+
+class TTLCache:
+    """
+    Caches computed values per key for `ttl` seconds.
+
+    On a miss the compute function runs in the threadpool (so blocking DB work
+    does not stall the event loop) and concurrent callers for the same key
+    await that single computation instead of starting their own.
+    Per worker process; each worker keeps its own copy.
+
+    With a `stale_ttl`, an expired value is still returned for that many
+    seconds past its expiry while one background computation replaces it
+    (stale-while-revalidate). Such compute functions outlive the request, so
+    they must not use request-scoped resources like the request's DB session.
+    `ttl` and `stale_ttl` can be overridden per key.
+
+    Invalidating a key also discards its computation if one is running, so
+    a value computed from data older than the invalidation is never stored.
+    Computations of other keys are unaffected.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 256, stale_ttl: float = 0):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._values: Dict[Hashable, Tuple[float, float, Any]] = {}  # key -> (fresh_until, stale_until, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._discarded: Set[Hashable] = set()  # Keys whose running computation was invalidated
+        self._background: Set[asyncio.Task] = set()
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                             ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> Any:
+        entry = self._values.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            if entry[0] > now:
+                record_cache(self.name, True)
+                return entry[2]
+            if entry[1] > now:
+                record_cache(self.name, True, stale=True)
+                if key not in self._inflight:
+                    task = asyncio.get_running_loop().create_task(self._refresh_quietly(key, compute, ttl, stale_ttl))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return entry[2]
+        record_cache(self.name, False)
+        return await self.refresh(key, compute, ttl, stale_ttl)
+
+    async def refresh(self, key: Hashable, compute: Callable[[], Any],
+                      ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> Any:
+        """Recompute and store a key (joins a computation of it already in progress)"""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await run_in_threadpool(compute)
+        except BaseException as e:
+            # Waiters see the same failure (or cancellation) instead of hanging
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved so failures without waiters are not logged as unhandled
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            discarded = key in self._discarded
+            self._discarded.discard(key)
+
+        if not discarded:
+            now = time.monotonic()
+            if len(self._values) >= self.max_entries:
+                self._values = {k: v for k, v in self._values.items() if v[1] > now}
+            fresh_until = now + (self.ttl if ttl is None else ttl)
+            self._values[key] = (fresh_until, fresh_until + (self.stale_ttl if stale_ttl is None else stale_ttl), value)
+        future.set_result(value)
+        return value
+
+    async def _refresh_quietly(self, key: Hashable, compute: Callable[[], Any],
+                               ttl: Optional[float], stale_ttl: Optional[float]):
+        try:
+            await self.refresh(key, compute, ttl, stale_ttl)
+        except Exception as e:
+            # The stale value stays in place until its stale window ends
+            print(f"Cache '{self.name}' background refresh of {key!r} failed: {e}")
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one key, or everything"""
+        if key is None:
+            self._values.clear()
+            self._discarded.update(self._inflight)
+        else:
+            self._values.pop(key, None)
+            if key in self._inflight:
+                self._discarded.add(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool], keep_stale: bool = False):
+        """
+        Drop every key matching `predicate`, or with `keep_stale` expire them
+        so they are served stale once more while being recomputed.
+        """
+        self._discarded.update(key for key in self._inflight if predicate(key))
+        for key in [key for key in self._values if predicate(key)]:
+            if keep_stale:
+                _, stale_until, value = self._values[key]
+                self._values[key] = (float("-inf"), stale_until, value)
+            else:
+                del self._values[key]
@@ -0,0 +1,177 @@
+"""
+Dashboard Statistics
+Admin dashboard counters computed with a few aggregate queries and served from a cached snapshot
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from sqlalchemy import desc, func, select, true
+from sqlalchemy.orm import Session
+from app.db_models import Order, OrderStatus, Product, ProductComment, User, UserRole
+from app.services.analytics_cache import analytics_cache, cached, with_read_session
+
+load_dotenv()
+
+LOW_STOCK_THRESHOLD = 10
+
+def compute_dashboard_stats(db: Session) -> Dict:
+    """
+    All dashboard counters in three queries: one row of FILTER aggregates
+    (one subquery per table, cross joined), products per category, and the
+    top rated products.
+    """
+    seven_days_ago = datetime.now() - timedelta(days=7)
+
+    users = select(
+        func.count().filter(User.role == UserRole.USER).label("total_users"),
+        func.count().filter(User.role == UserRole.ADMIN).label("total_admins")
+    ).select_from(User).subquery()
+
+    products = select(
+        func.count().label("total_products"),
+        func.count().filter(Product.stock < LOW_STOCK_THRESHOLD).label("low_stock_products")
+    ).select_from(Product).subquery()
+
+    comments = select(
+        func.count().label("total_comments"),
+        func.avg(ProductComment.rating).label("avg_rating"),
+        func.count().filter(ProductComment.created_at >= seven_days_ago).label("recent_comments_count")
+    ).select_from(ProductComment).subquery()
+
+    orders = select(
+        func.count().label("total_orders"),
+        func.count().filter(Order.status == OrderStatus.PENDING).label("pending_orders"),
+        func.count().filter(Order.status == OrderStatus.PROCESSING).label("processing_orders"),
+        func.count().filter(Order.status == OrderStatus.COMPLETED).label("completed_orders"),
+        func.count().filter(Order.status == OrderStatus.CANCELLED).label("cancelled_orders"),
+        func.sum(Order.total_amount).filter(
+            Order.status == OrderStatus.COMPLETED,
+            Order.payment_status == "completed"
+        ).label("total_revenue"),
+        func.count().filter(Order.created_at >= seven_days_ago).label("recent_orders_count")
+    ).select_from(Order).subquery()
+
+    # Each subquery is one row, so the cross join is one row too
+    totals = db.execute(
+        select(users, products, comments, orders).select_from(
+            users.join(products, true()).join(comments, true()).join(orders, true())
+        )
+    ).mappings().one()
+
+    products_by_category = db.query(
+        Product.category,
+        func.count(Product.id).label('count')
+    ).group_by(Product.category).all()
+
+    category_stats = {}
+    for category, count in products_by_category:
+        category_name = str(category) if category else "Uncategorized"
+        category_stats[category_name] = count
+
+    top_rated = db.query(
+        Product.id,
+        Product.name,
+        func.avg(ProductComment.rating).label('avg_rating'),
+        func.count(ProductComment.id).label('review_count')
+    ).join(ProductComment).group_by(Product.id, Product.name)\
+     .having(func.count(ProductComment.id) >= 1)\
+     .order_by(desc('avg_rating')).limit(5).all()
+
+    top_rated_products = []
+    for product_id, product_name, avg_rating, review_count in top_rated:
+        top_rated_products.append({
+            "id": product_id,
+            "name": product_name,
+            "avg_rating": round(float(avg_rating), 2),
+            "review_count": review_count
+        })
+
+    return {
+        "total_users": totals["total_users"],
+        "total_admins": totals["total_admins"],
+        "total_products": totals["total_products"],
+        "total_comments": totals["total_comments"],
+        "avg_rating": round(float(totals["avg_rating"]), 2) if totals["avg_rating"] else 0.0,
+        "low_stock_products": totals["low_stock_products"],
+        "products_by_category": category_stats,
+        "recent_comments_count": totals["recent_comments_count"],
+        "top_rated_products": top_rated_products,
+        "total_orders": totals["total_orders"],
+        "pending_orders": totals["pending_orders"],
+        "processing_orders": totals["processing_orders"],
+        "completed_orders": totals["completed_orders"],
+        "cancelled_orders": totals["cancelled_orders"],
+        "total_revenue": float(totals["total_revenue"]) if totals["total_revenue"] else 0.0,
+        "recent_orders_count": totals["recent_orders_count"]
+    }
+
+class DashboardStatsCache:
+    """
+    Serves the dashboard from a snapshot in the shared analytics cache.
+
+    A background task recomputes the snapshot every `refresh_interval`
+    seconds while the dashboard has been viewed in the last `idle_after`
+    seconds, so views normally never wait on the queries and idle workers
+    run no queries at all. A snapshot older
+    than `max_age` (or invalidated by an order change) is still served, and
+    a refresh is started in the background. A request waits only when there
+    is no snapshot yet, e.g. right after startup with the refresher disabled.
+    Refreshes are single-flight and run in the threadpool on the replica
+    when it is fresh. Per worker process.
+    """
+
+    KEY = ("dashboard",)
+
+    def __init__(self):
+        self.max_age = float(os.getenv("DASHBOARD_STATS_MAX_AGE", "60"))
+        self.refresh_interval = float(os.getenv("DASHBOARD_STATS_REFRESH_INTERVAL", "30"))
+        self.idle_after = float(os.getenv("DASHBOARD_STATS_IDLE_AFTER", "300"))
+        self._last_read = float("-inf")  # Never viewed
+        self._task: Optional[asyncio.Task] = None
+
+    def _query(self, db: Session) -> Dict:
+        stats = compute_dashboard_stats(db)
+        stats["generated_at"] = datetime.utcnow().isoformat()
+        return stats
+
+    async def refresh(self) -> Dict:
+        """Recompute the snapshot (joins a refresh already in progress)"""
+        return await analytics_cache.refresh(self.KEY, with_read_session(self._query),
+                                             self.max_age, float("inf"))
+
+    async def _refresh_quietly(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"Dashboard stats refresh failed: {e}")
+
+    async def get(self) -> Dict:
+        self._last_read = time.monotonic()
+        return await cached(self.KEY, self._query, self.max_age, float("inf"))
+
+    def start(self):
+        """Start the background refresher (call from the running loop)"""
+        if self.refresh_interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if time.monotonic() - self._last_read < self.idle_after:
+                await self._refresh_quietly()
+            await asyncio.sleep(self.refresh_interval)
+
+# Create singleton instance
+dashboard_stats = DashboardStatsCache()
@@ -6,6 +6,7 @@ from typing import List, Dict
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from app.services.metrics import external_call
 
 load_dotenv()
 
@@ -49,7 +50,7 @@ class EmailService:
             message.attach(html_part)
 
             # Connect to Gmail SMTP server
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+            with external_call("email", "smtp_send"), smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
                 server.starttls()  # Secure the connection
                 server.login(self.sender_email, self.sender_password)
                 server.send_message(message)
@@ -0,0 +1,280 @@
+"""
+Conversion Funnel
+Per-day, per-product funnel counts folded incrementally from user_activity_logs
+"""
+import asyncio
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import delete, desc, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.db_models import DailyProductFunnel, OrderItem, Product, RollupWatermark, UserActivityLog, UserActivityType
+from app.logging_helper import CLIENT_ORIGIN
+from app.services.analytics_cache import analytics_cache
+
+load_dotenv()
+
+WATERMARK = "funnel"
+
+# Funnel steps in order: (counter column, activity type)
+STEPS = [
+    ("views", UserActivityType.PRODUCT_VIEW.value),
+    ("cart_adds", UserActivityType.CART_ADD.value),
+    ("checkout_starts", UserActivityType.CHECKOUT_START.value),
+    ("checkout_completes", UserActivityType.CHECKOUT_COMPLETE.value),
+]
+STEP_COLUMNS = {activity_type: column for column, activity_type in STEPS}
+
+# Products one event can count for (a checkout lists its cart)
+MAX_EVENT_PRODUCTS = 50
+
+# Rows per multi-row upsert (keeps PostgreSQL under its bind parameter limit)
+UPSERT_CHUNK = 1000
+
+def _utc_day(created_at: Optional[datetime]) -> date:
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is None:
+        return created_at.date()
+    return created_at.astimezone(timezone.utc).date()
+
+def _is_client_row(row) -> bool:
+    """Posted through the public tracking endpoints, so anyone could have sent it"""
+    return isinstance(row.details, dict) and row.details.get("origin") == CLIENT_ORIGIN
+
+def _event_products(row, order_products: Dict[int, List[int]]) -> List[int]:
+    """
+    Products an activity row counts for: its product, the products of its
+    order, or the "product_ids" list in its details (at most
+    MAX_EVENT_PRODUCTS). Rows without any (such as the middleware's
+    path-only product_view and cart_add rows) are not counted.
+    """
+    if row.resource_type == "product" and row.resource_id:
+        return [row.resource_id]
+    if row.resource_type == "order" and row.resource_id:
+        return order_products.get(row.resource_id, [])
+    product_ids = row.details.get("product_ids") if isinstance(row.details, dict) else None
+    if isinstance(product_ids, list):
+        return list(dict.fromkeys(
+            product_id for product_id in product_ids[:MAX_EVENT_PRODUCTS] if isinstance(product_id, int)
+        ))
+    return []
+
+def _increment(db: Session, rows: List[Dict]):
+    """Add each row's step counts to its (day, product) counters, creating missing ones"""
+    insert_fn = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    columns = DailyProductFunnel.__table__.c
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        statement = insert_fn(DailyProductFunnel).values(rows[start:start + UPSERT_CHUNK])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["day", "product_id"],
+            set_={column: columns[column] + statement.excluded[column] for column, _ in STEPS}
+        ))
+
+class FunnelProcessor:
+    """
+    Folds new funnel activity rows into daily_product_funnel.
+
+    Only server-logged rows count: client-posted rows (details origin
+    "client") are skipped, as the tracking endpoints are public.
+
+    A watermark row remembers the last activity id processed. Each batch
+    reads the funnel rows above it in id order, adds their counts (weighted
+    by sample_weight) and moves the watermark in the same transaction, so
+    every row is counted exactly once. The watermark row is locked while a
+    batch runs, and other workers skip their turn instead of waiting.
+
+    Activity rows are written in batches and can commit out of id order, so
+    rows newer than `settle_seconds` (and any id above them) are left for a
+    later pass. This assumes rows are committed within half that time of
+    their created_at; the batched writers flush every second or so.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("FUNNEL_BATCH_SIZE", "5000"))
+        self.settle_seconds = float(os.getenv("FUNNEL_SETTLE_SECONDS", "30"))
+        self.interval = float(os.getenv("FUNNEL_PROCESS_INTERVAL", "60"))
+        self._task: Optional[asyncio.Task] = None
+
+    def _claim_watermark(self, db: Session) -> Optional[RollupWatermark]:
+        """Lock the watermark row (created on first use); None if another worker holds it"""
+        insert_fn = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        db.execute(insert_fn(RollupWatermark).values(name=WATERMARK, last_id=0).on_conflict_do_nothing())
+        return db.query(RollupWatermark).filter(RollupWatermark.name == WATERMARK)\
+            .with_for_update(skip_locked=True).first()
+
+    def process_batch(self, db: Session) -> Optional[Dict]:
+        """Fold in up to `batch_size` funnel rows and commit; None if another worker is processing"""
+        watermark = self._claim_watermark(db)
+        if watermark is None:
+            db.rollback()
+            return None
+
+        # Highest id that is safe to pass: just below the oldest unsettled row
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds)
+        unsettled = db.query(func.min(UserActivityLog.id)).filter(UserActivityLog.created_at >= cutoff).scalar()
+        upper = unsettled - 1 if unsettled is not None else db.query(func.max(UserActivityLog.id)).scalar() or 0
+
+        rows = db.query(
+            UserActivityLog.id, UserActivityLog.activity_type, UserActivityLog.resource_type,
+            UserActivityLog.resource_id, UserActivityLog.details, UserActivityLog.sample_weight,
+            UserActivityLog.created_at
+        ).filter(
+            UserActivityLog.id > watermark.last_id,
+            UserActivityLog.id <= upper,
+            UserActivityLog.activity_type.in_(list(STEP_COLUMNS))
+        ).order_by(UserActivityLog.id).limit(self.batch_size).all()
+
+        client = sum(1 for row in rows if _is_client_row(row))
+        rows_counted = [row for row in rows if not _is_client_row(row)]
+        order_ids = {row.resource_id for row in rows_counted if row.resource_type == "order" and row.resource_id}
+        order_products: Dict[int, List[int]] = defaultdict(list)
+        if order_ids:
+            for order_id, product_id in db.query(OrderItem.order_id, OrderItem.product_id)\
+                    .filter(OrderItem.order_id.in_(order_ids)).distinct():
+                order_products[order_id].append(product_id)
+
+        counters: Dict[tuple, Dict] = {}
+        events = unattributed = 0
+        for row in rows_counted:
+            product_ids = _event_products(row, order_products)
+            if not product_ids:
+                unattributed += 1
+                continue
+            events += 1
+            day = _utc_day(row.created_at)
+            column = STEP_COLUMNS[row.activity_type]
+            for product_id in product_ids:
+                counter = counters.setdefault((day, product_id), {
+                    "day": day, "product_id": product_id, **{name: 0 for name, _ in STEPS}
+                })
+                counter[column] += row.sample_weight or 1
+
+        if counters:
+            _increment(db, list(counters.values()))
+        # A short batch reached `upper`, so the ids up to it hold no more funnel rows
+        last_id = rows[-1].id if len(rows) == self.batch_size else max(upper, watermark.last_id)
+        watermark.last_id = last_id
+        watermark.updated_at = datetime.now(timezone.utc)
+        db.commit()
+        return {"rows": len(rows), "events": events, "unattributed": unattributed,
+                "client": client, "last_id": last_id}
+
+    def process_pending(self, db: Session, max_batches: Optional[int] = None) -> Dict:
+        """Run batches until caught up (or `max_batches`); totals of what was folded in"""
+        totals = {"batches": 0, "rows": 0, "events": 0, "unattributed": 0, "client": 0, "last_id": None}
+        while max_batches is None or totals["batches"] < max_batches:
+            result = self.process_batch(db)
+            if result is None:
+                break
+            totals["batches"] += 1
+            for key in ("rows", "events", "unattributed", "client"):
+                totals[key] += result[key]
+            totals["last_id"] = result["last_id"]
+            if result["rows"] < self.batch_size:
+                break
+        return totals
+
+    def reset(self, db: Session):
+        """Drop all counts and the watermark, so the next pass rebuilds from the oldest kept log row"""
+        db.execute(delete(DailyProductFunnel))
+        db.execute(delete(RollupWatermark).where(RollupWatermark.name == WATERMARK))
+        db.commit()
+
+    def _process(self) -> Dict:
+        db = SessionLocal()
+        try:
+            # Bounded per pass so a long backlog does not hold a threadpool thread for minutes
+            return self.process_pending(db, max_batches=20)
+        finally:
+            db.close()
+
+    async def run_once(self) -> Dict:
+        result = await run_in_threadpool(self._process)
+        if result["events"]:
+            analytics_cache.invalidate_where(lambda key: key[0] == "funnel")
+        return result
+
+    def start(self):
+        """Start the background processor (call from the running loop)"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Funnel processing failed: {e}")
+            await asyncio.sleep(self.interval)
+
+def _rate(count: int, base: int) -> float:
+    return round(count / base * 100, 2) if base else 0.0
+
+def funnel_report(db: Session, start_day: date, end_day: date,
+                  product_id: Optional[int] = None, limit: int = 10) -> Dict:
+    """Step counts and conversion rates over a day range, overall and for the most viewed products"""
+    sums = [func.coalesce(func.sum(getattr(DailyProductFunnel, column)), 0).label(column) for column, _ in STEPS]
+    filters = [DailyProductFunnel.day >= start_day, DailyProductFunnel.day <= end_day]
+    if product_id is not None:
+        filters.append(DailyProductFunnel.product_id == product_id)
+
+    totals = db.query(*sums).filter(*filters).one()
+    steps = []
+    for index, (column, activity_type) in enumerate(STEPS):
+        count = int(totals[index])
+        steps.append({
+            "step": activity_type,
+            "count": count,
+            # Share of the previous step's count, and of views
+            "conversion_rate": _rate(count, int(totals[index - 1])) if index else 100.0 if count else 0.0,
+            "overall_rate": _rate(count, int(totals[0])) if index else 100.0 if count else 0.0
+        })
+
+    top = db.query(DailyProductFunnel.product_id, Product.name, *sums)\
+        .outerjoin(Product, Product.id == DailyProductFunnel.product_id)\
+        .filter(*filters)\
+        .group_by(DailyProductFunnel.product_id, Product.name)\
+        .order_by(desc("views"), DailyProductFunnel.product_id).limit(limit).all()
+
+    products = []
+    for row in top:
+        counts = {column: int(getattr(row, column)) for column, _ in STEPS}
+        products.append({
+            "product_id": row.product_id,
+            "name": row.name,
+            **counts,
+            "view_to_cart_rate": _rate(counts["cart_adds"], counts["views"]),
+            "view_to_purchase_rate": _rate(counts["checkout_completes"], counts["views"]),
+            "checkout_completion_rate": _rate(counts["checkout_completes"], counts["checkout_starts"])
+        })
+
+    watermark = db.query(RollupWatermark).filter(RollupWatermark.name == WATERMARK).first()
+    return {
+        "start_date": start_day.isoformat(),
+        "end_date": end_day.isoformat(),
+        "product_id": product_id,
+        "steps": steps,
+        "products": products,
+        "processed_through_id": watermark.last_id if watermark else 0,
+        "processed_at": watermark.updated_at.isoformat() if watermark and watermark.updated_at else None
+    }
+
+# Create singleton instance
+funnel_processor = FunnelProcessor()
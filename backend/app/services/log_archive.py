@@ -0,0 +1,233 @@
+"""
+Log Archival
+Moves old log rows into date-sharded, gzipped JSONL files on local disk and purges them in batches
+"""
+import gzip
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app.db_models import APIRequestLog, OrderLog, UserActivityLog
+from app.services.log_export import json_default
+
+load_dotenv()
+
+def _as_utc(value: datetime) -> datetime:
+    """Timezone-aware UTC datetime (naive values are taken as UTC)"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+class LogArchiver:
+    """
+    Archives log rows older than each table's window to local files.
+
+    Rows are taken oldest first, `batch_size` per transaction. Each batch is
+    written as one gzipped JSONL part file per day under
+    <dir>/<table>/<YYYY>/<MM>/<YYYY-MM-DD>/, fsynced and added to the
+    manifest, and only then deleted from the table. If the delete fails the
+    batch's files and manifest entries are removed again, so a row is never
+    lost and normally never archived twice.
+    """
+
+    def __init__(self):
+        self.directory = os.getenv("LOG_ARCHIVE_DIR", "log_archive")
+        self.batch_size = int(os.getenv("LOG_ARCHIVE_BATCH_SIZE", "5000"))
+        # Archive rows older than this many days per table (0 never archives)
+        self.tables = {
+            "api_request_logs": (APIRequestLog, int(os.getenv("API_REQUEST_LOG_ARCHIVE_DAYS", "30"))),
+            "user_activity_logs": (UserActivityLog, int(os.getenv("USER_ACTIVITY_LOG_ARCHIVE_DAYS", "90"))),
+            "order_logs": (OrderLog, int(os.getenv("ORDER_LOG_ARCHIVE_DAYS", "0"))),
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.jsonl")
+
+    # ---------- manifest ----------
+
+    def manifest(self) -> List[Dict]:
+        """Every archived part file: table, day, path, rows, bytes, id and created_at range"""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _append_manifest(self, entries: List[Dict]):
+        # Append-only, one line per part file, so a batch costs one small write
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self.manifest_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _remove_manifest(self, entries: List[Dict]):
+        # Rare (failed batch): rewrite the manifest without the entries, then swap it in
+        removed = {entry["path"] for entry in entries}
+        with self._lock:
+            files = [entry for entry in self.manifest() if entry["path"] not in removed]
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in files:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.manifest_path)
+
+    # ---------- archiving ----------
+
+    def cutoff(self, table: str, now: Optional[datetime] = None) -> Optional[datetime]:
+        _, days = self.tables[table]
+        if days <= 0:
+            return None
+        return (now or datetime.now(timezone.utc)) - timedelta(days=days)
+
+    def pending(self, db: Session, table: str) -> int:
+        """Rows currently old enough to be archived"""
+        model, _ = self.tables[table]
+        cutoff = self.cutoff(table)
+        if cutoff is None:
+            return 0
+        return db.query(func.count(model.id)).filter(model.created_at < cutoff).scalar() or 0
+
+    def _write_part(self, table: str, day: date, rows: List[Dict]) -> Dict:
+        relative = os.path.join(table, f"{day:%Y}", f"{day:%m}", f"{day:%Y-%m-%d}",
+                                f"part-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.jsonl.gz")
+        path = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for row in rows:
+                    f.write((json.dumps(row, default=json_default) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+
+        created = [_as_utc(row["created_at"]) for row in rows]
+        return {
+            "table": table,
+            "day": day.isoformat(),
+            "path": relative,
+            "rows": len(rows),
+            "bytes": os.path.getsize(path),
+            "min_id": min(row["id"] for row in rows),
+            "max_id": max(row["id"] for row in rows),
+            "first_at": min(created).isoformat(),
+            "last_at": max(created).isoformat(),
+            "archived_at": datetime.now(timezone.utc).isoformat()
+        }
+
+    def _discard(self, entries: List[Dict]):
+        if entries:
+            self._remove_manifest(entries)
+        for entry in entries:
+            try:
+                os.remove(os.path.join(self.directory, entry["path"]))
+            except FileNotFoundError:
+                pass
+
+    def archive(self, db: Session, table: str, max_batches: Optional[int] = None) -> Dict:
+        """Archive and delete this table's expired rows; returns rows and files written"""
+        model, _ = self.tables[table]
+        cutoff = self.cutoff(table)
+        report = {"table": table, "rows": 0, "files": 0, "bytes": 0}
+        if cutoff is None:
+            return report
+        report["cutoff"] = cutoff.isoformat()
+
+        columns = model.__table__.c
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            rows = [dict(row) for row in db.execute(
+                select(model.__table__).where(columns.created_at < cutoff)
+                .order_by(columns.created_at).limit(self.batch_size)
+            ).mappings()]
+            if not rows:
+                break
+
+            by_day: Dict[date, List[Dict]] = {}
+            for row in rows:
+                by_day.setdefault(_as_utc(row["created_at"]).date(), []).append(row)
+
+            entries = []
+            try:
+                for day, day_rows in sorted(by_day.items()):
+                    entries.append(self._write_part(table, day, day_rows))
+                self._append_manifest(entries)
+                # created_at bound lets a partitioned table prune to the old partitions
+                db.execute(delete(model.__table__).where(
+                    columns.id.in_([row["id"] for row in rows]), columns.created_at < cutoff
+                ))
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._discard(entries)
+                raise
+
+            batches += 1
+            report["rows"] += len(rows)
+            report["files"] += len(entries)
+            report["bytes"] += sum(entry["bytes"] for entry in entries)
+        return report
+
+    # ---------- reading ----------
+
+    def summary(self) -> Dict:
+        """Archived files, rows, bytes and covered time range per table"""
+        tables = {table: {"files": 0, "rows": 0, "bytes": 0, "first_at": None, "last_at": None}
+                  for table in self.tables}
+        for entry in self.manifest():
+            stats = tables.setdefault(entry["table"], {"files": 0, "rows": 0, "bytes": 0, "first_at": None, "last_at": None})
+            stats["files"] += 1
+            stats["rows"] += entry["rows"]
+            stats["bytes"] += entry["bytes"]
+            if stats["first_at"] is None or entry["first_at"] < stats["first_at"]:
+                stats["first_at"] = entry["first_at"]
+            if stats["last_at"] is None or entry["last_at"] > stats["last_at"]:
+                stats["last_at"] = entry["last_at"]
+        return {"directory": self.directory, "tables": tables}
+
+    def read(self, table: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             skip: int = 0, limit: int = 100) -> Dict:
+        """
+        Archived rows of a table with start <= created_at <= end, in archive order.
+        Only part files whose time range overlaps the window are opened.
+        """
+        start = _as_utc(start) if start else None
+        end = _as_utc(end) if end else None
+        entries = sorted(
+            (entry for entry in self.manifest()
+             if entry["table"] == table
+             and (start is None or datetime.fromisoformat(entry["last_at"]) >= start)
+             and (end is None or datetime.fromisoformat(entry["first_at"]) <= end)),
+            key=lambda entry: (entry["first_at"], entry["path"])
+        )
+
+        rows, matched, files_read = [], 0, 0
+        for entry in entries:
+            if len(rows) >= limit:
+                break
+            files_read += 1
+            with gzip.open(os.path.join(self.directory, entry["path"]), "rt", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    created_at = _as_utc(datetime.fromisoformat(row["created_at"]))
+                    if (start and created_at < start) or (end and created_at > end):
+                        continue
+                    matched += 1
+                    if matched > skip:
+                        rows.append(row)
+                        if len(rows) >= limit:
+                            break
+        return {"table": table, "files_matched": len(entries), "files_read": files_read, "rows": rows}
+
+# Create singleton instance
+log_archiver = LogArchiver()
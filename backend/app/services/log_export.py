@@ -0,0 +1,105 @@
+"""
+Log Export
+Streams query results as NDJSON or CSV (optionally gzipped) using a server-side cursor
+"""
+import csv
+import enum
+import io
+import json
+import os
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, List
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+load_dotenv()
+
+# Rows fetched from the cursor (and written out) per round trip
+EXPORT_BATCH_SIZE = int(os.getenv("LOG_EXPORT_BATCH_SIZE", "2000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+def _csv_value(value: Any):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=json_default)
+    if isinstance(value, (datetime, date, enum.Enum, Decimal)):
+        return json_default(value)
+    return value
+
+def _ndjson_chunks(columns: List[str], batches: Iterator[List[tuple]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=json_default) + "\n" for row in batch
+        )
+
+def _csv_chunks(columns: List[str], batches: Iterator[List[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_query(query: Query, fmt: str = "ndjson", compress: bool = False) -> Iterator[bytes]:
+    """
+    Encoded export of every row of `query`.
+
+    The statement runs on its own session (same engine as the query's, so
+    replica routing is kept) because the request's session is closed before
+    the response body is streamed. Rows come from a server-side cursor
+    `EXPORT_BATCH_SIZE` at a time, so memory stays flat however many rows
+    match; each batch is encoded and (optionally) gzipped before the next is fetched.
+    """
+    bind = query.session.get_bind()
+    statement = query.statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    encode = _csv_chunks if fmt == "csv" else _ndjson_chunks
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: gzip container
+
+    session = Session(bind=bind)
+    try:
+        result = session.execute(statement)
+        batches = (list(partition) for partition in result.partitions())
+        for chunk in encode(list(result.keys()), batches):
+            data = chunk.encode("utf-8")
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor:
+            yield compressor.flush()
+    finally:
+        session.close()
+
+def export_response(query: Query, name: str, fmt: str = "ndjson", compress: bool = False) -> StreamingResponse:
+    """StreamingResponse downloading `query` as `<name>.<fmt>[.gz]`"""
+    filename = f"{name}_{datetime.utcnow():%Y%m%d_%H%M%S}.{fmt}"
+    media_type = EXPORT_FORMATS[fmt]
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        stream_query(query, fmt, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,197 @@
+"""
+Log Partition Management
+Monthly range partitioning on created_at for the log tables, with per-table retention
+"""
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import AddConstraint
+from app.db_models import APIRequestLog, OrderLog, UserActivityLog
+from app.schema import create_trigram_indexes
+
+load_dotenv()
+
+PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+def _month_start(day: date, offset: int = 0) -> date:
+    """First day of the month `offset` months away from `day`"""
+    index = day.year * 12 + (day.month - 1) + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+class LogPartitionManager:
+    """
+    Keeps the log tables partitioned by month.
+
+    `convert` turns an existing heap table into a partitioned table (one-off,
+    takes an exclusive lock while rows are copied). `maintain` pre-creates the
+    next months' partitions and detaches and drops partitions that fall
+    entirely outside the table's retention window. Date-bounded filters on
+    created_at then only scan the matching months (partition pruning).
+    """
+
+    def __init__(self):
+        self.months_ahead = int(os.getenv("LOG_PARTITION_MONTHS_AHEAD", "3"))
+        # Retention in months per table (0 keeps everything)
+        self.tables = {
+            "api_request_logs": (APIRequestLog, int(os.getenv("API_REQUEST_LOG_RETENTION_MONTHS", "3"))),
+            "user_activity_logs": (UserActivityLog, int(os.getenv("USER_ACTIVITY_LOG_RETENTION_MONTHS", "12"))),
+            "order_logs": (OrderLog, int(os.getenv("ORDER_LOG_RETENTION_MONTHS", "0"))),
+        }
+
+    @staticmethod
+    def is_partitioned(conn: Connection, table: str) -> bool:
+        return conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+        ), {"table": table}).first() is not None
+
+    @staticmethod
+    def partitions(conn: Connection, table: str) -> List[Dict]:
+        """Partitions of a table with their month (None for the default partition)"""
+        rows = conn.execute(text(
+            "SELECT c.relname, c.reltuples::bigint FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table ORDER BY c.relname"
+        ), {"table": table}).all()
+
+        result = []
+        for name, estimated_rows in rows:
+            match = PARTITION_NAME.search(name)
+            month = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+            result.append({"name": name, "month": month, "estimated_rows": max(0, estimated_rows)})
+        return result
+
+    @staticmethod
+    def create_partition(conn: Connection, table: str, month: date):
+        end = _month_start(month, 1)
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{table}_p{month:%Y%m}" PARTITION OF "{table}" '
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{end:%Y-%m-%d} 00:00:00+00')"
+        ))
+
+    def ensure_partitions(self, conn: Connection, table: str, today: Optional[date] = None) -> List[str]:
+        """Create this month's and the next months' partitions; returns names created"""
+        current = _month_start(today or date.today())
+        existing = {p["name"] for p in self.partitions(conn, table)}
+        created = []
+        for offset in range(self.months_ahead + 1):
+            month = _month_start(current, offset)
+            name = f"{table}_p{month:%Y%m}"
+            if name not in existing:
+                self.create_partition(conn, table, month)
+                created.append(name)
+        return created
+
+    def drop_expired(self, conn: Connection, table: str, retention_months: int, today: Optional[date] = None) -> List[str]:
+        """Detach and drop partitions older than the retention window; returns names dropped"""
+        if retention_months <= 0:
+            return []
+
+        cutoff = _month_start(today or date.today(), -retention_months)
+        dropped = []
+        for partition in self.partitions(conn, table):
+            if partition["month"] is None:
+                # Rows that landed in the default partition expire too
+                conn.execute(text(
+                    f'DELETE FROM "{partition["name"]}" WHERE created_at < :cutoff'
+                ), {"cutoff": cutoff})
+                continue
+            if _month_start(partition["month"], 1) > cutoff:
+                continue
+            conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{partition["name"]}"'))
+            conn.execute(text(f'DROP TABLE "{partition["name"]}"'))
+            dropped.append(partition["name"])
+        return dropped
+
+    def convert(self, conn: Connection, table: str, today: Optional[date] = None):
+        """Rebuild a heap log table as a partitioned table, copying its rows"""
+        model, _ = self.tables[table]
+        if self.is_partitioned(conn, table):
+            return
+
+        legacy = f"{table}_legacy"
+        conn.execute(text(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE'))
+
+        # Move the old table and its index names out of the way
+        conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+        for (index_name,) in conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+        ), {"table": legacy}).all():
+            conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name[:56]}_legacy"'))
+
+        # Partitioned parent: the primary key must include the partition key
+        conn.execute(text(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+        ))
+        conn.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN created_at SET NOT NULL'))
+        conn.execute(text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id, created_at)'))
+        conn.execute(text(f'ALTER SEQUENCE "{table}_id_seq" OWNED BY "{table}".id'))
+        for index in model.__table__.indexes:
+            index.create(conn)
+        create_trigram_indexes(conn, table)
+        for constraint in model.__table__.foreign_key_constraints:
+            conn.execute(AddConstraint(constraint))
+
+        # Partitions for every month that has rows, the months ahead, and a catch-all
+        oldest = conn.execute(text(f'SELECT MIN(created_at) FROM "{legacy}"')).scalar()
+        current = _month_start(today or date.today())
+        month = _month_start(oldest.date()) if oldest else current
+        while month < current:
+            self.create_partition(conn, table, month)
+            month = _month_start(month, 1)
+        self.ensure_partitions(conn, table, today)
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT'))
+
+        conn.execute(text(f'UPDATE "{legacy}" SET created_at = now() WHERE created_at IS NULL'))
+        conn.execute(text(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"'))
+        conn.execute(text(f'DROP TABLE "{legacy}"'))
+
+    def maintain(self, engine: Engine, today: Optional[date] = None) -> Dict:
+        """Pre-create future partitions and drop expired ones for every partitioned log table"""
+        report = {}
+        for table, (_, retention_months) in self.tables.items():
+            with engine.begin() as conn:
+                if not self.is_partitioned(conn, table):
+                    report[table] = {"partitioned": False}
+                    continue
+                report[table] = {
+                    "partitioned": True,
+                    "created": self.ensure_partitions(conn, table, today),
+                    "dropped": self.drop_expired(conn, table, retention_months, today),
+                }
+        return report
+
+    def status(self, engine: Engine) -> Dict:
+        report = {}
+        with engine.connect() as conn:
+            for table, (_, retention_months) in self.tables.items():
+                partitioned = self.is_partitioned(conn, table)
+                report[table] = {
+                    "partitioned": partitioned,
+                    "retention_months": retention_months,
+                    "partitions": [
+                        {"name": p["name"], "month": p["month"].isoformat() if p["month"] else "default",
+                         "estimated_rows": p["estimated_rows"]}
+                        for p in self.partitions(conn, table)
+                    ] if partitioned else []
+                }
+        return report
+
+    def ensure_future_partitions(self, engine: Engine):
+        """Startup hook: make sure inserts always have a partition to land in"""
+        if engine.dialect.name != "postgresql":
+            return
+        for table in self.tables:
+            try:
+                with engine.begin() as conn:
+                    if self.is_partitioned(conn, table):
+                        self.ensure_partitions(conn, table)
+            except Exception as e:
+                print(f"Failed to create partitions for {table}: {e}")
+
+# Create singleton instance
+log_partitions = LogPartitionManager()
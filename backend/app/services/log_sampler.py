@@ -0,0 +1,119 @@
+"""
+Log Sampling Service
+Decides which requests are persisted as log rows and with what sample weight
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Built-in 1-in-N rates for high-volume, low-value routes.
+# Keys are "METHOD /route/template", optionally suffixed with a status class ("2xx").
+DEFAULT_RULES = {
+    "POST /api/banners/{banner_id}/view": 20,
+    "POST /api/banners/{banner_id}/click": 5,
+    "GET /api/banners/active": 10,
+    "GET /api/products/": 10,
+    "GET /api/products/{product_id}/image": 20,
+    "GET /api/products/media/{media_id}": 20,
+}
+
+# Route label for requests that matched no route (404 scans, typos)
+UNMATCHED_ROUTE = "(unmatched)"
+
+# Cap on distinct routes tracked, so unmatched paths (404 scans) cannot grow memory
+MAX_TRACKED_ROUTES = 1000
+
+class LogSampler:
+    """
+    Per-route sampling for request and activity logs.
+
+    Errors (4xx/5xx) and slow requests are always kept. Other requests are kept
+    1-in-N, where N comes from the matching rule and, when a per-route target
+    rate is set, is raised automatically for routes whose volume in the last
+    minute exceeded it. Every kept row carries its weight N, so SUM(sample_weight)
+    is an unbiased estimate of the real request count.
+    """
+
+    def __init__(self):
+        self.rules: Dict[str, int] = {**DEFAULT_RULES, **json.loads(os.getenv("LOG_SAMPLING_RULES") or "{}")}
+        self.default_rate = int(os.getenv("LOG_SAMPLING_DEFAULT_RATE", "1"))
+        self.slow_threshold = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000")) / 1000
+        # Adaptive control: max rows per route per minute (0 disables)
+        self.target_per_minute = int(os.getenv("LOG_SAMPLING_TARGET_PER_MINUTE", "0"))
+
+        self._lock = threading.Lock()
+        self._window_started = time.monotonic()
+        self._current: Dict[str, int] = {}   # Requests seen per route this minute
+        self._previous: Dict[str, int] = {}  # Requests seen per route last minute
+        self.seen: Dict[str, int] = {}
+        self.kept: Dict[str, int] = {}
+
+    def rate_for(self, route: str, status_code: int) -> int:
+        """Configured 1-in-N rate for a route and status class"""
+        status_class = f"{status_code // 100}xx"
+        for key in (f"{route} {status_class}", route):
+            if key in self.rules:
+                return max(1, int(self.rules[key]))
+        return max(1, self.default_rate)
+
+    def sample(self, route: str, status_code: int, response_time: float) -> int:
+        """Return the sample weight to store, or 0 if the row should be dropped"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_started >= 60:
+                self._previous = self._current
+                self._current = {}
+                self._window_started = now
+            if route in self._current or len(self._current) < MAX_TRACKED_ROUTES:
+                self._current[route] = self._current.get(route, 0) + 1
+            if route in self.seen or len(self.seen) < MAX_TRACKED_ROUTES:
+                self.seen[route] = self.seen.get(route, 0) + 1
+            last_minute = self._previous.get(route, 0)
+
+        # Always keep errors and slow requests
+        if status_code >= 400 or response_time >= self.slow_threshold:
+            weight = 1
+        else:
+            rate = self.rate_for(route, status_code)
+            if self.target_per_minute and last_minute > self.target_per_minute:
+                rate = max(rate, math.ceil(last_minute / self.target_per_minute))
+            weight = rate if rate == 1 or random.random() < 1 / rate else 0
+
+        if weight and route in self.seen:
+            with self._lock:
+                self.kept[route] = self.kept.get(route, 0) + 1
+        return weight
+
+    def stats(self) -> Dict:
+        with self._lock:
+            routes = [
+                {"route": route, "seen": seen, "kept": self.kept.get(route, 0)}
+                for route, seen in self.seen.items()
+            ]
+        routes.sort(key=lambda r: r["seen"], reverse=True)
+        return {
+            "default_rate": self.default_rate,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "target_per_minute": self.target_per_minute,
+            "rules": self.rules,
+            "routes": routes
+        }
+
+def route_template(scope: dict) -> Optional[str]:
+    """Matched route template ('/api/products/{product_id}') for a request scope, if any"""
+    return getattr(scope.get("route"), "path", None)
+
+def route_key(scope: dict) -> str:
+    """'METHOD /route/{template}' for a request scope, falling back to the raw path"""
+    path = route_template(scope) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}"
+
+# Create singleton instance
+log_sampler = LogSampler()
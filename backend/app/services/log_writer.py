@@ -0,0 +1,252 @@
+"""
+Batched Log Writer
+Buffers log rows in a bounded in-process queue and bulk-inserts them from a background thread
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.db_models import APIRequestLog, User, UserActivityLog
+from app.services.api_rollups import api_rollups
+from app.services.metrics import record_error
+
+load_dotenv()
+
+class BatchLogWriter:
+    """
+    Takes log rows off the request path.
+
+    Requests only pay for a non-blocking enqueue. A background thread drains
+    the queue and writes rows with one multi-row INSERT per batch, flushing
+    when `batch_size` rows are waiting or `flush_interval` seconds have passed.
+    When the queue is full new rows are dropped and counted instead of making
+    requests wait.
+    """
+
+    def __init__(self, model, name: str, max_queue: int, batch_size: int, flush_interval: float):
+        self.model = model
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_at: Optional[datetime] = None
+        self.last_flush_ms = 0.0
+
+    def enqueue(self, row: Dict) -> bool:
+        """Queue one row for writing. Never blocks; returns False if dropped."""
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            record_error("log_writer", f"{self.name}_dropped")
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued, then stop the writer thread"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+            elif self._stopping.is_set():
+                self.periodic(final=True)
+                return
+            self.periodic()
+
+    def _next_batch(self) -> List[Dict]:
+        """Collect up to batch_size rows, waiting at most flush_interval"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            # Once stopping, drain what is left without waiting
+            timeout = 0 if self._stopping.is_set() else deadline - time.monotonic()
+            try:
+                if timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[Dict]):
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            rows = self.prepare(db, batch)
+            try:
+                db.execute(insert(self.model), rows)
+                db.commit()
+                written = len(rows)
+            except IntegrityError as e:
+                # One bad row fails the whole INSERT; write the rest one by one
+                db.rollback()
+                print(f"Batch of {len(rows)} {self.name} rows rejected ({e.orig}); retrying row by row")
+                written = self._write_rows(db, rows)
+            with self._lock:
+                self.written += written
+                self.failed += len(rows) - written
+        except Exception as e:
+            print(f"Failed to write {len(batch)} {self.name} rows: {e}")
+            record_error("log_writer", self.name)
+            db.rollback()
+            with self._lock:
+                self.failed += len(batch)
+        finally:
+            db.close()
+
+        with self._lock:
+            self.batches += 1
+            self.last_flush_at = datetime.utcnow()
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _write_rows(self, db: Session, rows: List[Dict]) -> int:
+        """Insert rows one at a time, skipping the ones the database rejects; returns how many were written"""
+        written = 0
+        for row in rows:
+            try:
+                db.execute(insert(self.model), [row])
+                db.commit()
+                written += 1
+            except IntegrityError as e:
+                db.rollback()
+                print(f"Dropped {self.name} row: {e.orig}")
+                record_error("log_writer", f"{self.name}_rejected")
+        return written
+
+    def prepare(self, db: Session, batch: List[Dict]) -> List[Dict]:
+        """Hook to turn queued rows into insertable rows"""
+        return batch
+
+    def periodic(self, final: bool = False):
+        """Hook run on the writer thread at least every flush_interval (final on stop)"""
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "running": self._thread is not None,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+                "last_flush_ms": round(self.last_flush_ms, 2)
+            }
+
+class APIRequestLogWriter(BatchLogWriter):
+    """
+    Writes APIRequestLog rows, resolving user emails to ids once per batch,
+    and flushes completed per-minute request rollups
+    """
+
+    def periodic(self, final: bool = False):
+        if not api_rollups.due(final):
+            return
+        db = SessionLocal()
+        try:
+            api_rollups.flush(db, final)  # Commits itself
+        except Exception as e:
+            print(f"Failed to write API request rollups: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def prepare(self, db: Session, batch: List[Dict]) -> List[Dict]:
+        return resolve_user_emails(db, batch)
+
+class UserActivityLogWriter(BatchLogWriter):
+    """
+    Writes UserActivityLog rows. Rows carry either a user_id or, from the
+    page logging middleware, the token's user_email, resolved once per batch.
+    Client-posted user ids are unchecked, so ids of unknown users are cleared.
+    """
+
+    def prepare(self, db: Session, batch: List[Dict]) -> List[Dict]:
+        return clear_unknown_user_ids(db, resolve_user_emails(db, batch))
+
+def resolve_user_emails(db: Session, batch: List[Dict]) -> List[Dict]:
+    """Replace each row's user_email with user_id, using one query for the whole batch"""
+    emails = {row["user_email"] for row in batch if row.get("user_email")}
+    user_ids = {}
+    if emails:
+        user_ids = dict(db.query(User.email, User.id).filter(User.email.in_(emails)).all())
+
+    rows = []
+    for row in batch:
+        row = dict(row)
+        email = row.pop("user_email", None)
+        if email:
+            row["user_id"] = user_ids.get(email)
+        else:
+            row.setdefault("user_id", None)
+        rows.append(row)
+    return rows
+
+def clear_unknown_user_ids(db: Session, rows: List[Dict]) -> List[Dict]:
+    """Set user_id to None on rows whose user does not exist, using one query for the whole batch"""
+    user_ids = {row["user_id"] for row in rows if row.get("user_id") is not None}
+    if not user_ids:
+        return rows
+    known = {user_id for user_id, in db.query(User.id).filter(User.id.in_(user_ids))}
+    for row in rows:
+        if row.get("user_id") is not None and row["user_id"] not in known:
+            row["user_id"] = None
+    return rows
+
+# Create singleton instances
+api_log_writer = APIRequestLogWriter(
+    APIRequestLog,
+    name="api_request_logs",
+    max_queue=int(os.getenv("API_LOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("API_LOG_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("API_LOG_FLUSH_INTERVAL", "1.0"))
+)
+
+activity_log_writer = UserActivityLogWriter(
+    UserActivityLog,
+    name="user_activity_logs",
+    max_queue=int(os.getenv("ACTIVITY_LOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL", "1.0"))
+)
@@ -0,0 +1,182 @@
+"""
+Event Loop Lag Monitor
+Samples asyncio event loop lag and attributes blocking calls to the route that caused them
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class LoopLagMonitor:
+    """
+    Opt-in watchdog for blocking work on the event loop.
+
+    An asyncio task wakes up every `interval` and measures how late it was
+    (the loop lag). A separate thread watches that heartbeat; when the loop has
+    been stuck for longer than `threshold`, it grabs the loop thread's current
+    stack, which is the code doing the blocking work, and finds the request
+    scope on that stack to tag the stall with its route.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+        self.interval = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000
+        self.threshold = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000
+        self.max_events = int(os.getenv("LOOP_MONITOR_MAX_EVENTS", "100"))
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._pending: Optional[Dict] = None  # Capture taken during the current stall
+        self.reset()
+
+    def reset(self):
+        """Clear all collected lag statistics"""
+        with self._lock:
+            self.samples = 0
+            self.total_lag = 0.0
+            self.max_lag = 0.0
+            self.stalls = 0
+            self.route_totals: Dict[str, Dict] = {}
+            self.events = deque(maxlen=self.max_events)
+            self.started_at = datetime.utcnow()
+
+    def start(self):
+        """Start the sampler task and watchdog thread (call from the running loop)"""
+        if not self.enabled or self._task is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+        print(f"✓ Event loop monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop sampling"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _sample(self):
+        """Sleep for one interval and record how late the loop woke us up"""
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self._record(max(0.0, now - started - self.interval))
+
+    def _watch(self):
+        """Watchdog thread: capture the loop stack while a stall is in progress"""
+        while not self._stop.wait(self.interval / 2):
+            overdue = time.monotonic() - self._heartbeat - self.interval
+            if overdue < self.threshold or self._pending is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._pending = self._capture(frame)
+
+    def _capture(self, frame) -> Dict:
+        """Extract route and stack from the blocked loop thread's frame"""
+        route = None
+        current = frame
+        while current is not None and route is None:
+            try:
+                scope = current.f_locals.get("scope")
+            except Exception:
+                scope = None
+            if isinstance(scope, dict) and scope.get("type") == "http":
+                route = self._route_label(scope)
+            current = current.f_back
+
+        stack = traceback.format_list(traceback.extract_stack(frame)[-15:])
+        return {"route": route or "unattributed", "stack": [line.rstrip() for line in stack]}
+
+    @staticmethod
+    def _route_label(scope: dict) -> str:
+        """Build 'METHOD /route/{template}' from an ASGI scope"""
+        route = scope.get("route")
+        path = getattr(route, "path", None) or scope.get("path", "")
+        return f"{scope.get('method', '')} {path}".strip()
+
+    def _record(self, lag: float):
+        """Record one lag sample, attributing it to a route if it was a stall"""
+        with self._lock:
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+            if lag < self.threshold:
+                self._pending = None
+                return
+
+            capture = self._pending or {"route": "unattributed", "stack": []}
+            self._pending = None
+            self.stalls += 1
+
+            totals = self.route_totals.setdefault(capture["route"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            totals["count"] += 1
+            totals["total_ms"] += lag * 1000
+            totals["max_ms"] = max(totals["max_ms"], lag * 1000)
+
+            self.events.append({
+                "route": capture["route"],
+                "lag_ms": round(lag * 1000, 2),
+                "stack": capture["stack"],
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+    def snapshot(self) -> Dict:
+        """Return lag stats with routes ranked by total blocking time"""
+        with self._lock:
+            routes = [
+                {
+                    "route": route,
+                    "count": totals["count"],
+                    "total_ms": round(totals["total_ms"], 2),
+                    "max_ms": round(totals["max_ms"], 2),
+                    "avg_ms": round(totals["total_ms"] / totals["count"], 2)
+                }
+                for route, totals in self.route_totals.items()
+            ]
+            routes.sort(key=lambda r: r["total_ms"], reverse=True)
+
+            return {
+                "enabled": self.enabled,
+                "running": self._task is not None,
+                "threshold_ms": self.threshold * 1000,
+                "interval_ms": self.interval * 1000,
+                "since": self.started_at.isoformat(),
+                "samples": self.samples,
+                "avg_lag_ms": round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+                "max_lag_ms": round(self.max_lag * 1000, 2),
+                "stalls": self.stalls,
+                "routes": routes,
+                "recent_stalls": list(reversed(self.events))
+            }
+
+# Create singleton instance
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,167 @@
+"""
+Memory Accounting
+tracemalloc-based allocation tracking that can be switched on and off on a live worker
+"""
+import os
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Allocations made by tracemalloc itself and the import machinery are not interesting
+_IGNORED_FILES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux), if available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    except (ImportError, OSError):
+        return None
+
+class MemoryTracker:
+    """
+    Per-route peak allocation tracking on top of tracemalloc.
+
+    Tracing slows allocations down noticeably, so it is off unless
+    MEMORY_TRACE_ENABLED is set or an admin starts it. While it is on, each
+    request's peak is the traced peak minus the traced size at its start.
+    The peak counter is process-wide: it is reset when a request starts with
+    no other traced request in flight, and requests that overlapped another
+    are counted as such (their peak may include the other request's memory).
+    """
+
+    def __init__(self):
+        self.frames = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._overlap_epoch = 0  # Bumped whenever a request starts while another is running
+        self.enabled = False
+        self.started_at: Optional[datetime] = None
+        self.reset()
+        if os.getenv("MEMORY_TRACE_ENABLED", "false").lower() == "true":
+            self.start()
+
+    def reset(self):
+        with self._lock:
+            self.routes: Dict[str, Dict] = {}
+            self.since = datetime.utcnow()
+
+    def start(self, frames: Optional[int] = None):
+        """Start tracing allocations (`frames` of traceback kept per allocation)"""
+        with self._lock:
+            if frames:
+                self.frames = frames
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            tracemalloc.start(self.frames)
+            self.enabled = True
+            self.started_at = datetime.utcnow()
+            self._in_flight = 0
+
+    def stop(self):
+        """Stop tracing and free tracemalloc's bookkeeping; per-route stats are kept"""
+        with self._lock:
+            self.enabled = False
+            self.started_at = None
+            tracemalloc.stop()
+
+    # ---------- per request ----------
+
+    def request_started(self) -> Optional[tuple]:
+        """Traced size, overlap epoch and whether others were running at request start (None when off)"""
+        with self._lock:
+            if not self.enabled or not tracemalloc.is_tracing():
+                return None
+            alone = self._in_flight == 0
+            if alone:
+                tracemalloc.reset_peak()
+            else:
+                self._overlap_epoch += 1
+            self._in_flight += 1
+            current, _ = tracemalloc.get_traced_memory()
+            return current, self._overlap_epoch, alone
+
+    def request_finished(self, route: str, started: tuple):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if not self.enabled or not tracemalloc.is_tracing():
+                return
+            start_bytes, epoch, alone = started
+            current, peak = tracemalloc.get_traced_memory()
+            peak_bytes = max(0, peak - start_bytes)
+            overlapped = not alone or epoch != self._overlap_epoch
+
+            stats = self.routes.setdefault(route, {
+                "requests": 0, "overlapped": 0, "max_peak_bytes": 0,
+                "total_peak_bytes": 0, "max_retained_bytes": 0
+            })
+            stats["requests"] += 1
+            stats["overlapped"] += overlapped
+            stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak_bytes)
+            stats["total_peak_bytes"] += peak_bytes
+            stats["max_retained_bytes"] = max(stats["max_retained_bytes"], current - start_bytes)
+
+    # ---------- reporting ----------
+
+    def top_sites(self, limit: int = 25, group_by: str = "lineno") -> List[Dict]:
+        """Largest live allocation sites (expensive: takes a full snapshot)"""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_FILES)
+        sites = []
+        for stat in snapshot.statistics(group_by)[:limit]:
+            frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+            sites.append({
+                "site": frames[-1] if frames else None,
+                "traceback": frames if len(frames) > 1 else None,
+                "size_bytes": stat.size,
+                "count": stat.count
+            })
+        return sites
+
+    def snapshot(self, limit: int = 25, group_by: str = "lineno") -> Dict:
+        """Process memory, traced totals, top allocation sites and per-route peaks"""
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            routes = [
+                {
+                    "route": route,
+                    **stats,
+                    "avg_peak_bytes": stats["total_peak_bytes"] // stats["requests"] if stats["requests"] else 0
+                }
+                for route, stats in self.routes.items()
+            ]
+            since = self.since
+        routes.sort(key=lambda stats: stats["max_peak_bytes"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "frames": self.frames,
+            "tracing_since": self.started_at.isoformat() if self.started_at else None,
+            "rss_bytes": _rss_bytes(),
+            "max_rss_bytes": _max_rss_bytes(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracemalloc.is_tracing() else 0,
+            "top_sites": self.top_sites(limit, group_by),
+            "routes_since": since.isoformat(),
+            "routes": routes
+        }
+
+# Create singleton instance
+memory_tracker = MemoryTracker()
@@ -0,0 +1,122 @@
+"""
+Prometheus Metrics
+In-process metrics registry exposed in Prometheus text format at /metrics.
+
+Multi-worker deployments: set PROMETHEUS_MULTIPROC_DIR to an empty, writable
+directory (cleared on deploy) before the workers start. Each worker then writes
+its samples there and any worker's /metrics returns the aggregate.
+"""
+import os
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# prometheus_client reads PROMETHEUS_MULTIPROC_DIR when it is imported
+load_dotenv()
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Optional bearer token required to scrape /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# ==================== HTTP ====================
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request duration", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ["method"],
+    multiprocess_mode="livesum"
+)
+
+# ==================== DATABASE POOL ====================
+
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity", "Pool size plus max overflow", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+DB_POOL_EVENTS = Counter(
+    "db_pool_events_total", "Connection pool events", ["event"]
+)
+
+# ==================== DATABASE QUERIES ====================
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+DB_REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+)
+DB_REQUEST_TIME = Histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL per HTTP request", ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ["route"]
+)
+DB_QUERY_VIOLATIONS = Counter(
+    "db_query_violations_total", "Requests over their query budget or repeating a statement (N+1)", ["route", "kind"]
+)
+
+# ==================== CACHES ====================
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups: hit, stale (served while refreshing) or miss", ["cache", "result"]
+)
+
+# ==================== EXTERNAL SERVICES ====================
+
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds", "Latency of calls to external services", ["service", "operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+# ==================== ERRORS ====================
+
+ERRORS = Counter(
+    "app_errors_total", "Errors by component", ["component", "kind"]
+)
+
+def record_cache(cache: str, hit: bool, stale: bool = False):
+    CACHE_REQUESTS.labels(cache, "stale" if stale else "hit" if hit else "miss").inc()
+
+def record_error(component: str, kind: str):
+    ERRORS.labels(component, kind).inc()
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """Time a call to an external service; exceptions are counted and re-raised"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(service, type(e).__name__)
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.labels(service, operation).observe(time.perf_counter() - started)
+
+def render_metrics():
+    """Return (payload, content type) for a scrape, aggregating workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
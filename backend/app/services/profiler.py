@@ -0,0 +1,211 @@
+"""
+On-Demand Request Profiler
+Samples the stacks of the next N matching requests and keeps flamegraph-ready profiles in memory
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pseudo-frame for samples taken while the request was suspended (awaiting I/O or threadpool work)
+AWAITING_FRAME = ("(awaiting)", "", 0)
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+class RequestProfile:
+    """Aggregated stack samples of one profiled request"""
+
+    def __init__(self, scope: dict, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = scope.get("method", "")
+        self.path = scope.get("path", "")
+        self.scope = scope
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self.duration = 0.0
+        self.status_code: Optional[int] = None
+        self.samples = 0
+        # stack (root first) -> sampled milliseconds
+        self.stacks: Dict[Tuple[Frame, ...], float] = {}
+
+    @property
+    def route(self) -> str:
+        return getattr(self.scope.get("route"), "path", None) or self.path
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 2),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": len(self.stacks)
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format (flamegraph.pl, speedscope, inferno)"""
+        lines = []
+        for stack, ms in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            names = ";".join(f"{name} ({file}:{line})" if file else name for name, file, line in stack)
+            lines.append(f"{names} {max(1, round(ms))}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> str:
+        """speedscope.app file format, one sampled profile weighted in milliseconds"""
+        frames: List[Dict] = []
+        index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, ms in self.stacks.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, file, line = frame
+                    frames.append({"name": name, "file": file, "line": line} if file else {"name": name})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(round(ms, 3))
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights
+            }],
+            "name": f"{self.method} {self.path} {self.started_at:%Y-%m-%d %H:%M:%S}",
+            "exporter": "aviroze-profiler"
+        })
+
+class RequestProfiler:
+    """
+    Opt-in sampling profiler armed from the admin API.
+
+    While armed, the next `remaining` requests whose method and path match
+    are profiled: a thread samples the event loop thread's stack every
+    `interval` and keeps the frames above the request's middleware frame, or
+    an "(awaiting)" sample while the request is suspended. Only the loop
+    thread is sampled, so sync work handed to the threadpool shows up as
+    awaiting time. When not armed the middleware does nothing beyond one
+    attribute check and no sampler thread exists.
+
+    Finished profiles are kept in a ring buffer of `max_profiles`.
+    """
+
+    def __init__(self):
+        self.max_profiles = int(os.getenv("PROFILER_MAX_PROFILES", "20"))
+        self.default_interval = float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000
+        self.max_duration = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+        self.max_depth = 128
+
+        self._lock = threading.Lock()
+        self.armed = False
+        self.method: Optional[str] = None
+        self.path_prefix = ""
+        self.remaining = 0
+        self.interval = self.default_interval
+        self.profiles: "deque[RequestProfile]" = deque(maxlen=self.max_profiles)
+        self._cwd = os.getcwd() + os.sep
+
+    def arm(self, path_prefix: str, count: int, method: Optional[str] = None, interval_ms: Optional[float] = None):
+        """Profile the next `count` requests whose path starts with `path_prefix`"""
+        with self._lock:
+            self.path_prefix = path_prefix
+            self.method = method.upper() if method else None
+            self.remaining = count
+            self.interval = interval_ms / 1000 if interval_ms else self.default_interval
+            self.armed = count > 0
+
+    def disarm(self):
+        with self._lock:
+            self.armed = False
+            self.remaining = 0
+
+    def clear(self):
+        with self._lock:
+            self.profiles.clear()
+
+    def claim(self, scope: dict) -> Optional[RequestProfile]:
+        """Take one of the remaining profiling slots if this request matches"""
+        if scope.get("method") == "OPTIONS" or (self.method and scope.get("method") != self.method):
+            return None
+        if not scope.get("path", "").startswith(self.path_prefix):
+            return None
+        with self._lock:
+            if not self.armed or self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.armed = False
+            return RequestProfile(scope, self.interval)
+
+    def sample(self, profile: RequestProfile, anchor, loop_thread_id: int, done: threading.Event):
+        """Sampler thread body: runs until `done` is set or max_duration passes"""
+        deadline = time.monotonic() + self.max_duration
+        last = time.perf_counter()
+        while not done.wait(profile.interval) and time.monotonic() < deadline:
+            now = time.perf_counter()
+            elapsed_ms = (now - last) * 1000
+            last = now
+            frame = sys._current_frames().get(loop_thread_id)
+            stack = self._stack_above(frame, anchor) if frame is not None else None
+            key = tuple(stack) if stack else (AWAITING_FRAME,)
+            profile.stacks[key] = profile.stacks.get(key, 0.0) + elapsed_ms
+            profile.samples += 1
+
+    def _stack_above(self, frame, anchor) -> Optional[List[Frame]]:
+        """Frames from just above `anchor` to `frame` (root first), or None if anchor is not on the stack"""
+        frames = []
+        while frame is not None:
+            if frame is anchor:
+                frames.reverse()
+                return frames[-self.max_depth:] if len(frames) > self.max_depth else frames
+            code = frame.f_code
+            filename = code.co_filename
+            if filename.startswith(self._cwd):
+                filename = filename[len(self._cwd):]
+            elif "site-packages" in filename:
+                filename = filename.split("site-packages" + os.sep, 1)[-1]
+            frames.append((code.co_name, filename, code.co_firstlineno))
+            frame = frame.f_back
+        return None
+
+    def finish(self, profile: RequestProfile, duration: float):
+        profile.duration = duration
+        with self._lock:
+            self.profiles.append(profile)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "armed": self.armed,
+                "method": self.method,
+                "path_prefix": self.path_prefix,
+                "remaining": self.remaining,
+                "interval_ms": self.interval * 1000,
+                "max_profiles": self.max_profiles,
+                "profiles": [profile.summary() for profile in reversed(self.profiles)]
+            }
+
+# Create singleton instance
+request_profiler = RequestProfiler()
@@ -0,0 +1,233 @@
+"""
+SQL Query Instrumentation
+Per-request query counts and DB time from SQLAlchemy cursor events, plus a slow-query log
+and query budget / N+1 checks
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.services.log_sampler import UNMATCHED_ROUTE, route_template
+from app.services.metrics import DB_QUERY_DURATION, DB_QUERY_VIOLATIONS, DB_SLOW_QUERIES
+
+load_dotenv()
+
+# Adds X-DB-Queries / X-DB-Time response headers
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+
+# Query budget / N+1 checks: "off", "warn" (log and count) or "strict" (also fail the request)
+QUERY_CHECKS = os.getenv("QUERY_CHECKS", "off").lower()
+# The same statement this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+class RequestQueryStats:
+    """Queries and DB time of one request (shared with threadpool work through the context)"""
+
+    __slots__ = ("scope", "queries", "db_time", "shapes", "budget")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        # Executions per statement text, only kept while query checks are on
+        self.shapes: Optional[Dict[str, int]] = {} if QUERY_CHECKS != "off" else None
+        self.budget: Optional[int] = None
+
+    @property
+    def route(self) -> str:
+        # Known once routing has matched; the raw path is not used to keep labels bounded
+        return route_template(self.scope) or UNMATCHED_ROUTE
+
+    def violations(self) -> List[Dict]:
+        """Budget overrun and repeated statements (likely N+1) of this request"""
+        found = []
+        if self.budget is not None and self.queries > self.budget:
+            found.append({"kind": "budget", "queries": self.queries, "budget": self.budget})
+        for statement, count in (self.shapes or {}).items():
+            if count >= N_PLUS_ONE_THRESHOLD:
+                found.append({"kind": "n_plus_one", "count": count, "statement": statement[:1000]})
+        return found
+
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+class SlowQueryLog:
+    """
+    Ring buffer of statements slower than `threshold`.
+
+    With `explain` on, SELECTs are re-run with EXPLAIN (ANALYZE, BUFFERS) on
+    a background thread (PostgreSQL only, in a rolled-back transaction with a
+    statement timeout), at most once per statement per `explain_interval`.
+    Writes are never re-run.
+    """
+
+    def __init__(self):
+        self.threshold = float(os.getenv("SLOW_QUERY_MS", "200")) / 1000
+        self.max_entries = int(os.getenv("SLOW_QUERY_MAX_ENTRIES", "100"))
+        self.explain = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+        self.explain_interval = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+
+        self._lock = threading.Lock()
+        self._explain_queue: "queue.Queue" = queue.Queue(maxsize=10)
+        self._explained_at: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.entries = deque(maxlen=self.max_entries)
+            self.total = 0
+            self.since = datetime.utcnow()
+
+    def record(self, engine: Engine, statement: str, parameters, duration: float, route: Optional[str], executemany: bool):
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "route": route,
+            "statement": statement[:5000],
+            "parameters": repr(parameters)[:1000],
+            "executemany": executemany,
+            "plan": None
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.total += 1
+        DB_SLOW_QUERIES.labels(route or "(background)").inc()
+
+        if self.explain and not executemany and engine.dialect.name == "postgresql" \
+                and statement.lstrip()[:6].upper().startswith(("SELECT", "WITH")):
+            now = time.monotonic()
+            with self._lock:
+                if now - self._explained_at.get(statement, -self.explain_interval) < self.explain_interval:
+                    return
+                if len(self._explained_at) >= 1000:
+                    self._explained_at.clear()
+                self._explained_at[statement] = now
+            try:
+                self._explain_queue.put_nowait((engine, statement, parameters, entry))
+            except queue.Full:
+                return
+            self._ensure_explainer()
+
+    def _ensure_explainer(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_explains, name="slow-query-explain", daemon=True)
+                self._thread.start()
+
+    def _run_explains(self):
+        while True:
+            engine, statement, parameters, entry = self._explain_queue.get()
+            try:
+                with engine.connect() as conn:
+                    # ANALYZE runs the statement; a data-modifying CTE fails here instead of writing
+                    conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+                    conn.exec_driver_sql("SET LOCAL statement_timeout = 30000")
+                    rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters).all()
+                    conn.rollback()
+                entry["plan"] = "\n".join(row[0] for row in rows)
+            except Exception as e:
+                entry["plan"] = f"EXPLAIN failed: {e}"
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            entries = sorted(self.entries, key=lambda e: e["duration_ms"], reverse=True)
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "explain": self.explain,
+                "total": self.total,
+                "since": self.since.isoformat(),
+                "queries": entries
+            }
+
+slow_queries = SlowQueryLog()
+
+class QueryViolationLog:
+    """Ring buffer of requests that failed the query checks"""
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("QUERY_VIOLATIONS_MAX_ENTRIES", "100"))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.entries = deque(maxlen=self.max_entries)
+            self.total = 0
+            self.since = datetime.utcnow()
+
+    def record(self, stats: RequestQueryStats, violations: List[Dict]):
+        route = stats.route
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "method": stats.scope.get("method"),
+            "route": route,
+            "queries": stats.queries,
+            "violations": violations
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.total += 1
+        for violation in violations:
+            DB_QUERY_VIOLATIONS.labels(route, violation["kind"]).inc()
+        print(f"Query check failed: {entry['method']} {route} ({stats.queries} queries): "
+              + ", ".join(f"{v['kind']} x{v.get('count', v.get('queries'))}" for v in violations))
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": QUERY_CHECKS,
+                "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+                "total": self.total,
+                "since": self.since.isoformat(),
+                "requests": list(reversed(self.entries))
+            }
+
+query_violations = QueryViolationLog()
+
+def query_budget(max_queries: int):
+    """
+    Route dependency capping the SQL statements a request may run, e.g.
+    `dependencies=[query_budget(5)]`. Only checked when QUERY_CHECKS is on.
+    """
+    async def set_query_budget():
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    set_query_budget.max_queries = max_queries
+    return Depends(set_query_budget)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    DB_QUERY_DURATION.observe(duration)
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += duration
+        if stats.shapes is not None:
+            stats.shapes[statement] = stats.shapes.get(statement, 0) + 1
+
+    if duration >= slow_queries.threshold and not statement.startswith("EXPLAIN"):
+        slow_queries.record(conn.engine, statement, parameters, duration,
+                            stats.route if stats else None, executemany)
+
+def instrument(engine: Engine):
+    """Attach the cursor timing hooks to an engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
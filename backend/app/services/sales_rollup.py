@@ -0,0 +1,132 @@
+"""
+Daily Sales Rollup
+Per-day order, item and revenue totals kept current inside the order's own transaction
+"""
+from datetime import date, datetime, time, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func, insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.db_models import DailyCategorySales, DailySales, Order, OrderItem, OrderStatus, Product
+
+UNCATEGORIZED = "Uncategorized"
+
+def order_day(created_at: Optional[datetime]) -> date:
+    """UTC day an order is counted on"""
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is None:
+        return created_at.date()
+    return created_at.astimezone(timezone.utc).date()
+
+def _upsert(db: Session, model, keys: Dict, deltas: Dict):
+    """Add `deltas` to the row at `keys`, creating it if missing (atomic under concurrency)"""
+    insert_fn = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = insert_fn(model).values(**keys, **deltas)
+    columns = model.__table__.c
+    db.execute(statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: columns[name] + statement.excluded[name] for name in deltas}
+    ))
+
+def _order_lines(db: Session, order_id: int) -> List:
+    """(category, items, revenue) of an order's items"""
+    return db.query(
+        Product.category,
+        func.sum(OrderItem.quantity),
+        func.sum(OrderItem.price * OrderItem.quantity)
+    ).join(Product, OrderItem.product_id == Product.id)\
+     .filter(OrderItem.order_id == order_id)\
+     .group_by(Product.category).all()
+
+def _apply_completed(db: Session, day: date, order: Order, lines: List, sign: int):
+    _upsert(db, DailySales, {"day": day}, {
+        "completed_orders": sign,
+        "completed_items": sign * sum(items or 0 for _, items, _ in lines),
+        "completed_revenue": sign * (order.total_amount or 0)
+    })
+    for category, items, revenue in lines:
+        _upsert(db, DailyCategorySales, {"day": day, "category": category or UNCATEGORIZED}, {
+            "completed_items": sign * (items or 0),
+            "completed_revenue": sign * float(revenue or 0)
+        })
+
+def record_order_created(db: Session, order: Order):
+    """Count a new order; call after its items are added and before the commit"""
+    db.flush()
+    lines = _order_lines(db, order.id)
+    day = order_day(order.created_at)
+    _upsert(db, DailySales, {"day": day}, {
+        "orders": 1,
+        "items": sum(items or 0 for _, items, _ in lines)
+    })
+    if order.status == OrderStatus.COMPLETED:
+        _apply_completed(db, day, order, lines, 1)
+
+def record_status_change(db: Session, order: Order, previous_status: OrderStatus):
+    """Move an order into or out of the completed totals; call before the commit"""
+    was_completed = previous_status == OrderStatus.COMPLETED
+    is_completed = order.status == OrderStatus.COMPLETED
+    if was_completed == is_completed:
+        return
+    _apply_completed(db, order_day(order.created_at), order, _order_lines(db, order.id),
+                     1 if is_completed else -1)
+
+def backfill(db: Session, since: Optional[date] = None) -> Dict:
+    """
+    Rebuild the rollup from the orders table (from `since`, or everything).
+
+    On PostgreSQL the rollup tables are locked first: orders committed
+    earlier are recounted here, and orders still in flight wait for the lock
+    and add themselves afterwards, so nothing is lost or counted twice.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE daily_sales, daily_category_sales IN EXCLUSIVE MODE"))
+
+    start = datetime.combine(since, time.min, tzinfo=timezone.utc) if since else None
+    days: Dict[date, Dict] = {}
+    categories: Dict[tuple, Dict] = {}
+
+    def day_row(day: date) -> Dict:
+        return days.setdefault(day, {"day": day, "orders": 0, "items": 0, "completed_orders": 0,
+                                     "completed_items": 0, "completed_revenue": 0.0})
+
+    orders = db.query(Order.created_at, Order.status, Order.total_amount)
+    if start:
+        orders = orders.filter(Order.created_at >= start)
+    for created_at, status, total_amount in orders.yield_per(5000):
+        row = day_row(order_day(created_at))
+        row["orders"] += 1
+        if status == OrderStatus.COMPLETED:
+            row["completed_orders"] += 1
+            row["completed_revenue"] += total_amount or 0
+
+    items = db.query(
+        Order.created_at, Order.status, Product.category, OrderItem.quantity, OrderItem.price
+    ).join(Order, OrderItem.order_id == Order.id).join(Product, OrderItem.product_id == Product.id)
+    if start:
+        items = items.filter(Order.created_at >= start)
+    for created_at, status, category, quantity, price in items.yield_per(5000):
+        day = order_day(created_at)
+        row = day_row(day)
+        row["items"] += quantity or 0
+        if status == OrderStatus.COMPLETED:
+            row["completed_items"] += quantity or 0
+            key = (day, category or UNCATEGORIZED)
+            category_row = categories.setdefault(key, {"day": day, "category": key[1],
+                                                       "completed_items": 0, "completed_revenue": 0.0})
+            category_row["completed_items"] += quantity or 0
+            category_row["completed_revenue"] += (price or 0) * (quantity or 0)
+
+    for model in (DailySales, DailyCategorySales):
+        statement = delete(model)
+        if since:
+            statement = statement.where(model.day >= since)
+        db.execute(statement)
+    if days:
+        db.execute(insert(DailySales), list(days.values()))
+    if categories:
+        db.execute(insert(DailyCategorySales), list(categories.values()))
+    db.commit()
+    return {"since": since.isoformat() if since else None, "days": len(days), "category_rows": len(categories)}
@@ -7,6 +7,7 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from app.db_models import User, Address
+from app.services.metrics import external_call
 
 load_dotenv()
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
@@ -58,26 +59,27 @@ class StripeService:
             # If user already has a Stripe customer ID, update it
             if user.stripe_customer_id:
                 try:
-                    customer = stripe.Customer.modify(
-                        user.stripe_customer_id,
-                        name=user.username,
-                        email=user.email,
-                        phone=address.phone_number if address.phone_number else None,
-                        shipping={
-                            "name": shipping_address["name"],
-                            "address": {
-                                "line1": shipping_address["line1"],
-                                "city": shipping_address["city"],
-                                "state": shipping_address["state"],
-                                "postal_code": shipping_address["postal_code"],
-                                "country": shipping_address["country"],
+                    with external_call("stripe", "Customer.modify"):
+                        customer = stripe.Customer.modify(
+                            user.stripe_customer_id,
+                            name=user.username,
+                            email=user.email,
+                            phone=address.phone_number if address.phone_number else None,
+                            shipping={
+                                "name": shipping_address["name"],
+                                "address": {
+                                    "line1": shipping_address["line1"],
+                                    "city": shipping_address["city"],
+                                    "state": shipping_address["state"],
+                                    "postal_code": shipping_address["postal_code"],
+                                    "country": shipping_address["country"],
+                                }
+                            },
+                            metadata={
+                                "user_id": str(user.id),
+                                "user_public_id": user.public_id,
                             }
-                        },
-                        metadata={
-                            "user_id": str(user.id),
-                            "user_public_id": user.public_id,
-                        }
-                    )
+                        )
                     print(f"[Stripe] Updated customer {customer.id} for user {user.email}")
                     return customer.id
                 except stripe.error.InvalidRequestError:
@@ -86,25 +88,26 @@ class StripeService:
                     user.stripe_customer_id = None
 
             # Create new Stripe customer
-            customer = stripe.Customer.create(
-                name=user.username,
-                email=user.email,
-                phone=address.phone_number if address.phone_number else None,
-                shipping={
-                    "name": shipping_address["name"],
-                    "address": {
-                        "line1": shipping_address["line1"],
-                        "city": shipping_address["city"],
-                        "state": shipping_address["state"],
-                        "postal_code": shipping_address["postal_code"],
-                        "country": shipping_address["country"],
+            with external_call("stripe", "Customer.create"):
+                customer = stripe.Customer.create(
+                    name=user.username,
+                    email=user.email,
+                    phone=address.phone_number if address.phone_number else None,
+                    shipping={
+                        "name": shipping_address["name"],
+                        "address": {
+                            "line1": shipping_address["line1"],
+                            "city": shipping_address["city"],
+                            "state": shipping_address["state"],
+                            "postal_code": shipping_address["postal_code"],
+                            "country": shipping_address["country"],
+                        }
+                    },
+                    metadata={
+                        "user_id": str(user.id),
+                        "user_public_id": user.public_id,
                     }
-                },
-                metadata={
-                    "user_id": str(user.id),
-                    "user_public_id": user.public_id,
-                }
-            )
+                )
 
             # Save the Stripe customer ID to database
             user.stripe_customer_id = customer.id
@@ -133,7 +136,8 @@ class StripeService:
         if user.stripe_customer_id:
             try:
                 # Verify customer still exists in Stripe
-                stripe.Customer.retrieve(user.stripe_customer_id)
+                with external_call("stripe", "Customer.retrieve"):
+                    stripe.Customer.retrieve(user.stripe_customer_id)
                 return user.stripe_customer_id
             except stripe.error.InvalidRequestError:
                 # Customer doesn't exist, create new one
@@ -154,7 +158,8 @@ class StripeService:
         """
         if user.stripe_customer_id:
             try:
-                stripe.Customer.delete(user.stripe_customer_id)
+                with external_call("stripe", "Customer.delete"):
+                    stripe.Customer.delete(user.stripe_customer_id)
                 print(f"[Stripe] Deleted customer {user.stripe_customer_id}")
                 user.stripe_customer_id = None
                 db.commit()
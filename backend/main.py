@@ -1,15 +1,27 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth_router, products_router, users_router, comments_router, analytics_router, payments_router, orders_router, banners_router, addresses_router, wishlists_router
+from app.routes import auth_router, products_router, users_router, comments_router, analytics_router, payments_router, orders_router, banners_router, addresses_router, wishlists_router, cart_router
 from app.routes.logs import router as logs_router
 from app.routes.collections import router as collections_router
+from app.routes.monitoring import router as monitoring_router
 from app.database import engine, Base, SessionLocal
+from app.schema import upgrade_schema
 from app.db_models import User, UserRole, UserStatus
 from app.auth import get_password_hash
-from app.middleware import LoggingMiddleware, APILoggingMiddleware
+from app.middleware import LoggingMiddleware, APILoggingMiddleware, MetricsMiddleware, QueryStatsMiddleware, ProfilerMiddleware, MemoryMiddleware
+from app.services.loop_monitor import loop_monitor
+from app.services.log_writer import api_log_writer, activity_log_writer
+from app.services.log_partitions import log_partitions
+from app.services.dashboard_stats import dashboard_stats
+from app.services.funnel import funnel_processor
+from app.services.metrics import METRICS_ENABLED, METRICS_TOKEN, render_metrics
+import asyncio
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+log_partitions.ensure_future_partitions(engine)
 
 # Initialize default users
 def initialize_default_users():
@@ -53,10 +65,27 @@ def initialize_default_users():
 # Initialize default users on startup
 initialize_default_users()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start background monitors and log writers
+    loop_monitor.start()
+    api_log_writer.start()
+    activity_log_writer.start()
+    dashboard_stats.start()
+    funnel_processor.start()
+    yield
+    # Flush queued logs and stop background work
+    await asyncio.to_thread(api_log_writer.stop)
+    await asyncio.to_thread(activity_log_writer.stop)
+    await dashboard_stats.stop()
+    await funnel_processor.stop()
+    await loop_monitor.stop()
+
 app = FastAPI(
     title="Aviroze E-Commerce API",
     description="Backend API for Aviroze premium fashion e-commerce",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS - Allow all localhost ports for development
@@ -79,6 +108,15 @@ app.add_middleware(
 app.add_middleware(APILoggingMiddleware)
 # LoggingMiddleware - Logs user activities and page visits
 app.add_middleware(LoggingMiddleware)
+# QueryStatsMiddleware - Per-request SQL query count and DB time
+app.add_middleware(QueryStatsMiddleware)
+# ProfilerMiddleware - On-demand sampling profiler (no-op unless armed by an admin)
+app.add_middleware(ProfilerMiddleware)
+# MemoryMiddleware - Per-route peak allocations (no-op unless tracemalloc tracing is on)
+app.add_middleware(MemoryMiddleware)
+# MetricsMiddleware - Prometheus request metrics (outermost, so it times the whole stack)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router)
@@ -93,6 +131,8 @@ app.include_router(logs_router)
 app.include_router(banners_router)
 app.include_router(addresses_router)
 app.include_router(wishlists_router)
+app.include_router(cart_router)
+app.include_router(monitoring_router)
 
 @app.get("/")
 async def root():
@@ -105,3 +145,12 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        """Prometheus scrape endpoint"""
+        if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+        payload, content_type = render_metrics()
+        return Response(content=payload, media_type=content_type)
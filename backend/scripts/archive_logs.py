@@ -0,0 +1,57 @@
+"""
+Log archival
+
+Commands:
+    run [table ...]       Move rows older than each table's *_LOG_ARCHIVE_DAYS
+                          window into gzipped JSONL files under LOG_ARCHIVE_DIR,
+                          deleting them from the database in batches
+    pending               Count rows currently due for archiving
+    summary               Archived files, rows and time range per table
+
+Run `run` daily from cron, before partition maintenance drops old months, e.g.:
+    30 2 * * * cd /app/backend && python scripts/archive_logs.py run
+
+Usage (from the backend directory):
+    python scripts/archive_logs.py <command> [--max-batches N]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.log_archive import log_archiver
+
+def main():
+    parser = argparse.ArgumentParser(description="Log archival")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("tables", nargs="*", help="Tables to archive (default: all log tables)")
+    run_parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches per table")
+    subparsers.add_parser("pending")
+    subparsers.add_parser("summary")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        print(json.dumps(log_archiver.summary(), indent=2))
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "pending":
+            print(json.dumps({table: log_archiver.pending(db, table) for table in log_archiver.tables}, indent=2))
+            return
+
+        unknown = set(args.tables) - set(log_archiver.tables)
+        if unknown:
+            sys.exit(f"Unknown log tables: {', '.join(sorted(unknown))}")
+        for table in args.tables or list(log_archiver.tables):
+            report = log_archiver.archive(db, table, args.max_batches)
+            print(f"✓ {table}: archived {report['rows']} rows into {report['files']} files ({report['bytes']} bytes)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Backfill the daily sales rollup
+
+Rebuilds daily_sales and daily_category_sales from the orders table, either
+completely or from a given UTC day on. Run it once after deploying the
+rollup (earlier orders are not counted until then) and any time the rollup
+is suspected to have drifted. Safe to re-run; the rebuilt range is replaced
+in one transaction.
+
+Usage (from the backend directory):
+    python scripts/backfill_daily_sales.py [--since YYYY-MM-DD]
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine
+from app.services.sales_rollup import backfill
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollup from orders")
+    parser.add_argument("--since", type=date.fromisoformat, help="First UTC day to rebuild (default: everything)")
+    args = parser.parse_args()
+
+    # The rollup tables are new; make sure they exist before the first run
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        result = backfill(db, args.since)
+        print(f"Rebuilt {result['days']} days and {result['category_rows']} day/category rows"
+              + (f" since {result['since']}" if result["since"] else ""))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Backfill route templates for existing API request logs
+
+Matches each distinct (method, path) of rows without a route against the
+application's route regexes (the same matching FastAPI does at request time)
+and stores the template, e.g. GET /api/products/123 -> /api/products/{product_id}.
+Rows are updated in chunks of paths per template, so the table is never
+locked for long. Safe to re-run; only rows with no route are touched.
+
+Usage (from the backend directory):
+    python scripts/backfill_route_templates.py [--chunk-size 500]
+"""
+import argparse
+import os
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.routing import Route
+from main import app
+from app.database import SessionLocal
+from app.db_models import APIRequestLog
+from app.services.log_sampler import UNMATCHED_ROUTE
+
+def resolve_template(method: str, path: str) -> str:
+    """Route template for a request, preferring a route that also matches the method"""
+    path_match = None
+    for route in app.routes:
+        if not isinstance(route, Route) or not route.path_regex.match(path):
+            continue
+        if route.methods is None or method in route.methods:
+            return route.path
+        path_match = path_match or route.path
+    return path_match or UNMATCHED_ROUTE
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill api_request_logs.route")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        pairs = db.query(APIRequestLog.method, APIRequestLog.path).filter(
+            APIRequestLog.route.is_(None)
+        ).distinct().all()
+        print(f"{len(pairs)} distinct method/path pairs to resolve")
+
+        groups: Dict[Tuple[str, str], List[str]] = {}
+        for method, path in pairs:
+            groups.setdefault((method, resolve_template(method, path)), []).append(path)
+
+        updated = 0
+        for (method, template), paths in groups.items():
+            for i in range(0, len(paths), args.chunk_size):
+                updated += db.query(APIRequestLog).filter(
+                    APIRequestLog.route.is_(None),
+                    APIRequestLog.method == method,
+                    APIRequestLog.path.in_(paths[i:i + args.chunk_size])
+                ).update({
+                    APIRequestLog.route: template[:500],
+                    APIRequestLog.endpoint: f"{method} {template}"[:500]
+                }, synchronize_session=False)
+                db.commit()
+
+        print(f"✓ Backfilled {updated} rows across {len(groups)} routes")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
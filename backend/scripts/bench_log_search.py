@@ -0,0 +1,85 @@
+"""
+Substring search benchmark (PostgreSQL)
+
+Seeds a scratch copy of user_activity_logs with N rows (default 1,000,000),
+then times the admin log search queries with EXPLAIN ANALYZE before and after
+creating the pg_trgm GIN indexes. The scratch table is dropped afterwards;
+the real log tables are not touched.
+
+Usage (from the backend directory):
+    python scripts/bench_log_search.py [rows]
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+TABLE = "bench_user_activity_logs"
+
+QUERIES = {
+    "ip contains": f"SELECT id FROM {TABLE} WHERE ip_address ILIKE '%.123.4%' ORDER BY created_at DESC LIMIT 50",
+    "description contains": f"SELECT id FROM {TABLE} WHERE description ILIKE '%checkout 4242%' ORDER BY created_at DESC LIMIT 50",
+    "search (description or ip)": (
+        f"SELECT id FROM {TABLE} WHERE description ILIKE '%viewed product 9876%' OR ip_address ILIKE '%9876%' "
+        f"ORDER BY created_at DESC LIMIT 50"
+    ),
+}
+
+def timed(conn, sql: str) -> float:
+    """Execution time in ms (best of 3, so the first run's cache misses do not dominate)"""
+    times = []
+    for _ in range(3):
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")).scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        times.append(plan[0]["Execution Time"])
+    return min(times)
+
+def main(rows: int):
+    if engine.dialect.name != "postgresql":
+        sys.exit("This benchmark requires PostgreSQL")
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"CREATE UNLOGGED TABLE {TABLE} (LIKE user_activity_logs INCLUDING DEFAULTS)"))
+        conn.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN id DROP DEFAULT"))
+        print(f"Seeding {rows:,} rows...")
+        conn.execute(text(f"""
+            INSERT INTO {TABLE} (id, activity_type, ip_address, description, sample_weight, created_at)
+            SELECT g,
+                   (ARRAY['page_view', 'product_view', 'login', 'cart_add', 'checkout_start'])[1 + g % 5],
+                   (g % 223) || '.' || (g % 197) || '.' || (g % 251) || '.' || (g % 239),
+                   (ARRAY['viewed product ', 'checkout ', 'logged in from ', 'added to cart '])[1 + g % 4] || (g % 10007),
+                   1,
+                   now() - (g || ' seconds')::interval
+            FROM generate_series(1, :rows) g
+        """), {"rows": rows})
+        conn.execute(text(f"CREATE INDEX ON {TABLE} (created_at)"))
+        conn.execute(text(f"CREATE INDEX ON {TABLE} (ip_address)"))
+        conn.execute(text(f"ANALYZE {TABLE}"))
+
+    try:
+        with engine.connect() as conn:
+            before = {name: timed(conn, sql) for name, sql in QUERIES.items()}
+
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX ON {TABLE} USING gin (ip_address gin_trgm_ops)"))
+            conn.execute(text(f"CREATE INDEX ON {TABLE} USING gin (description gin_trgm_ops)"))
+            conn.execute(text(f"ANALYZE {TABLE}"))
+
+        with engine.connect() as conn:
+            after = {name: timed(conn, sql) for name, sql in QUERIES.items()}
+
+        print(f"{'query':<30}{'btree only (ms)':>18}{'trigram (ms)':>16}{'speedup':>10}")
+        for name in QUERIES:
+            print(f"{name:<30}{before[name]:>18.1f}{after[name]:>16.1f}{before[name] / after[name]:>9.1f}x")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
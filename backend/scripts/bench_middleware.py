@@ -0,0 +1,122 @@
+"""
+Middleware overhead benchmark
+
+Compares per-request overhead of the logging middlewares as pure ASGI
+middleware against the previous BaseHTTPMiddleware implementation.
+Requests are driven straight through the ASGI interface (no network, no
+database) so only the middleware cost is measured.
+
+Usage (from the backend directory):
+    python scripts/bench_middleware.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.middleware import APILoggingMiddleware, LoggingMiddleware
+from app.services.log_writer import api_log_writer
+
+# Measure middleware cost only, not queue growth
+api_log_writer.enqueue = lambda row: True
+
+class LegacyAPILoggingMiddleware(BaseHTTPMiddleware):
+    """Previous APILoggingMiddleware shape: BaseHTTPMiddleware + call_next"""
+
+    async def dispatch(self, request: Request, call_next):
+        if not request.url.path.startswith('/api/'):
+            return await call_next(request)
+        start_time = time.time()
+        response = await call_next(request)
+        response_time = time.time() - start_time
+        api_log_writer.enqueue({
+            "method": request.method,
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "response_time": response_time,
+            "ip_address": request.client.host if request.client else None,
+            "user_agent": request.headers.get("user-agent", None),
+            "query_params": dict(request.query_params) if request.query_params else None,
+        })
+        response.headers["X-Process-Time"] = str(response_time)
+        return response
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """Previous LoggingMiddleware shape for /api/ paths (skipped, but still wrapped)"""
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path.startswith('/api/'):
+            return await call_next(request)
+        return await call_next(request)
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(50):
+                yield b"x" * 1024
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    if variant == "legacy":
+        app.add_middleware(LegacyAPILoggingMiddleware)
+        app.add_middleware(LegacyLoggingMiddleware)
+    elif variant == "asgi":
+        app.add_middleware(APILoggingMiddleware)
+        app.add_middleware(LoggingMiddleware)
+    return app
+
+async def run(app: FastAPI, path: str, requests: int) -> float:
+    """Return mean microseconds per request"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+    async def send(message):
+        pass
+
+    async def request():
+        received = False
+
+        async def receive():
+            # Body-less request; afterwards the client just stays connected
+            nonlocal received
+            if received:
+                await asyncio.Event().wait()
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(dict(scope), receive, send)
+
+    # Warm up (builds the middleware stack and route caches)
+    for _ in range(200):
+        await request()
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await request()
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+async def main(requests: int):
+    for path in ("/api/ping", "/api/stream"):
+        results = {variant: await run(build_app(variant), path, requests) for variant in ("none", "legacy", "asgi")}
+        print(f"{path} ({requests} requests)")
+        for variant, micros in results.items():
+            overhead = micros - results["none"]
+            print(f"  {variant:<7} {micros:8.1f} us/request   overhead {overhead:+8.1f} us")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,30 @@
+"""
+Create the trigram search indexes
+
+Builds the pg_trgm GIN indexes behind the admin substring searches (see
+TRIGRAM_INDEXES in app/schema.py) with CREATE INDEX CONCURRENTLY, so log
+inserts and user writes carry on during the build. Run it once after
+deploying (it can take a while on large log tables) and again after an
+interrupted run; indexes that already exist are skipped. Creating the
+pg_trgm extension needs a role allowed to do so.
+
+Usage (from the backend directory):
+    python scripts/create_trigram_indexes.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.schema import build_trigram_indexes
+
+def main():
+    if engine.dialect.name != "postgresql":
+        sys.exit("Trigram indexes require PostgreSQL")
+
+    for name, result in build_trigram_indexes(engine).items():
+        print(f"{name}: {result}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Log table partition maintenance (PostgreSQL)
+
+Commands:
+    convert [table ...]   Rebuild log tables as monthly range partitions on
+                          created_at (one-off; locks the table while rows are copied)
+    maintain              Pre-create upcoming monthly partitions and detach/drop
+                          partitions older than each table's retention
+    status                List partitions with estimated row counts
+
+Run `maintain` daily from cron, e.g.:
+    0 3 * * * cd /app/backend && python scripts/log_partitions.py maintain
+
+Usage (from the backend directory):
+    python scripts/log_partitions.py <command>
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.services.log_partitions import log_partitions
+
+def main():
+    parser = argparse.ArgumentParser(description="Log table partition maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert")
+    convert_parser.add_argument("tables", nargs="*", help="Tables to convert (default: all log tables)")
+    subparsers.add_parser("maintain")
+    subparsers.add_parser("status")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("Log partitioning requires PostgreSQL")
+
+    if args.command == "convert":
+        unknown = set(args.tables) - set(log_partitions.tables)
+        if unknown:
+            sys.exit(f"Unknown log tables: {', '.join(sorted(unknown))}")
+        for table in args.tables or list(log_partitions.tables):
+            with engine.begin() as conn:
+                log_partitions.convert(conn, table)
+            print(f"✓ {table} partitioned by month")
+    elif args.command == "maintain":
+        print(json.dumps(log_partitions.maintain(engine), indent=2))
+    else:
+        print(json.dumps(log_partitions.status(engine), indent=2))
+
+if __name__ == "__main__":
+    main()
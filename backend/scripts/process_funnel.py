@@ -0,0 +1,46 @@
+"""
+Process the conversion funnel
+
+Folds activity log rows not yet counted into daily_product_funnel, until
+caught up. The API workers do this every FUNNEL_PROCESS_INTERVAL seconds; run
+it by hand after deploying (to work through existing logs in one go), from
+cron when the interval is 0, or with --reset to rebuild the counts from the
+activity logs still in the database (archived rows are not recounted).
+
+Usage (from the backend directory):
+    python scripts/process_funnel.py [--reset]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine
+from app.services.funnel import funnel_processor
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold new activity logs into the conversion funnel")
+    parser.add_argument("--reset", action="store_true", help="Drop the counts and rebuild them from the start")
+    args = parser.parse_args()
+
+    # The funnel tables are new; make sure they exist before the first run
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        if args.reset:
+            funnel_processor.reset(db)
+        result = funnel_processor.process_pending(db)
+        if not result["batches"]:
+            print("Another process is folding in the funnel; try again later")
+            return
+        print(f"Processed {result['rows']} activity rows in {result['batches']} batches: "
+              f"{result['events']} counted, {result['unattributed']} without a product, "
+              f"{result['client']} client-posted "
+              f"(through id {result['last_id']})")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Query budget tests
+
+Seeds a scratch database (users, products with images, completed orders and
+reviews), calls every endpoint that declares a query budget
+(`dependencies=[query_budget(N)]`) and fails when one goes over its budget or
+repeats a statement N_PLUS_ONE_THRESHOLD+ times, so per-row query regressions
+break CI. A budgeted endpoint without a request below fails too.
+
+Requests are driven straight through the ASGI interface with QUERY_CHECKS=warn.
+By default a temporary SQLite database is used; set QUERY_BUDGET_DATABASE_URL
+to run against a scratch PostgreSQL database instead (tables are created and
+rows added; do not point this at a real database).
+
+Usage (from the backend directory):
+    pytest tests/test_query_budgets.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp_dir = None
+if os.getenv("QUERY_BUDGET_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["QUERY_BUDGET_DATABASE_URL"]
+else:
+    _tmp_dir = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir.name, 'query_budgets.db')}"
+os.environ.pop("REPLICA_DATABASE_URL", None)
+os.environ["QUERY_CHECKS"] = "warn"
+os.environ["DEBUG"] = "true"
+
+from main import app
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.db_models import Order, OrderItem, OrderStatus, Product, ProductComment, ProductImage, User
+from app.services.query_stats import N_PLUS_ONE_THRESHOLD, query_violations
+
+# Rows per parent, comfortably above N_PLUS_ONE_THRESHOLD so per-row queries show up
+PRODUCTS = 8
+ORDERS = 8
+ITEMS_PER_ORDER = 3
+
+def seed() -> dict:
+    """Add products, orders and reviews for the default user; returns ids used in paths"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == "user@user.com").one()
+        products = []
+        for i in range(PRODUCTS):
+            product = Product(name=f"Budget product {i}", description="Seeded by check_query_budgets",
+                              price=10.0 + i, category="test", stock=100)
+            product.images = [
+                ProductImage(image=b"\x89PNG", image_mimetype="image/png", display_order=n)
+                for n in range(2)
+            ]
+            products.append(product)
+        db.add_all(products)
+        db.flush()
+
+        orders = []
+        for i in range(ORDERS):
+            order = Order(user_id=user.id, status=OrderStatus.COMPLETED, total_amount=30.0,
+                          payment_status="completed", created_at=datetime.utcnow() - timedelta(days=i))
+            order.items = [
+                OrderItem(product_id=products[(i + n) % PRODUCTS].id, quantity=1, price=10.0)
+                for n in range(ITEMS_PER_ORDER)
+            ]
+            orders.append(order)
+        db.add_all(orders)
+        db.flush()
+
+        db.add_all([
+            ProductComment(product_id=products[0].id, user_id=user.id, order_id=order.id,
+                           rating=5, comment="Seeded review")
+            for order in orders
+            if any(item.product_id == products[0].id for item in order.items)
+        ])
+        db.add_all([
+            ProductComment(product_id=product.id, user_id=user.id, order_id=orders[0].id,
+                           rating=4, comment="Seeded review")
+            for product in products[1:]
+        ])
+        db.commit()
+        return {"product_id": products[0].id, "order_id": orders[0].id}
+    finally:
+        db.close()
+
+async def call(method: str, path: str, token: str) -> tuple:
+    """Run one request through the app; returns (status, X-DB-Queries)"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"budget-check"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 50000), "server": ("budget-check", 80),
+    }
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+
+    await app(scope, receive, send)
+    return response["status"], int(response["headers"].get(b"x-db-queries", b"0"))
+
+def budgeted_routes() -> dict:
+    """{"METHOD /path/template": budget} for every route with a query_budget dependency"""
+    budgets = {}
+    for route in app.routes:
+        for dependency in getattr(route, "dependencies", []):
+            max_queries = getattr(dependency.dependency, "max_queries", None)
+            if max_queries is not None:
+                for method in route.methods:
+                    budgets[f"{method} {route.path}"] = max_queries
+    return budgets
+
+USER_TOKEN = create_access_token(data={"sub": "user@user.com"})
+ADMIN_TOKEN = create_access_token(data={"sub": "admin@admin.com"})
+
+# Route template -> (concrete path with {ids} placeholders, caller)
+REQUESTS = {
+    "GET /api/comments/": ("/api/comments/?product_id={product_id}", USER_TOKEN),
+    "GET /api/comments/admin/all": ("/api/comments/admin/all", ADMIN_TOKEN),
+    "GET /api/comments/eligible-purchases/{product_id}": ("/api/comments/eligible-purchases/{product_id}", USER_TOKEN),
+    "GET /api/orders/my-orders": ("/api/orders/my-orders", USER_TOKEN),
+    "GET /api/orders/{order_id}": ("/api/orders/{order_id}", USER_TOKEN),
+    "GET /api/orders/admin/all": ("/api/orders/admin/all", ADMIN_TOKEN),
+}
+
+@pytest.fixture(scope="module")
+def ids() -> dict:
+    yield seed()
+    if _tmp_dir:
+        _tmp_dir.cleanup()
+
+@pytest.mark.parametrize("endpoint,budget", sorted(budgeted_routes().items()))
+def test_query_budget(endpoint: str, budget: int, ids: dict):
+    assert endpoint in REQUESTS, f"{endpoint} has a query budget but no request in this module"
+    path, token = REQUESTS[endpoint]
+
+    query_violations.reset()
+    status, queries = asyncio.run(call(endpoint.split(" ", 1)[0], path.format(**ids), token))
+    violations = [violation for entry in query_violations.entries for violation in entry["violations"]]
+
+    assert status == 200, f"{endpoint} returned {status}"
+    assert not violations, (
+        f"{endpoint} ran {queries} queries (budget {budget}, N+1 threshold {N_PLUS_ONE_THRESHOLD}):\n"
+        + "\n".join(json.dumps(violation)[:300] for violation in violations)
+    )
@@ -18,12 +18,15 @@ export default function LogsPage() {
   const [apiLogs, setApiLogs] = useState<APIRequestLog[]>([]);
   const [apiStats, setApiStats] = useState<APIRequestLogStats | null>(null);
   const [page, setPage] = useState(1);
+  const [totalLogs, setTotalLogs] = useState<number | null>(null);
+  const [totalApproximate, setTotalApproximate] = useState(false);
   const logsPerPage = 50;
 
   // Filters
   const [searchQuery, setSearchQuery] = useState('');
   const [activityTypeFilter, setActivityTypeFilter] = useState('');
   const [ipFilter, setIpFilter] = useState('');
+  const [routeFilter, setRouteFilter] = useState('');
   const [showFilters, setShowFilters] = useState(false);
 
   useEffect(() => {
@@ -44,14 +47,16 @@ export default function LogsPage() {
     if (activeTab === 'orders') fetchOrderLogs();
     else if (activeTab === 'activities') fetchActivityLogs();
     else fetchApiLogs();
-  }, [page, searchQuery, activityTypeFilter, ipFilter]);
+  }, [page, searchQuery, activityTypeFilter, ipFilter, routeFilter]);
 
   const fetchOrderLogs = async () => {
     try {
       setLoading(true);
       setError('');
       const data = await logsService.orders.getAll({ skip: (page - 1) * logsPerPage, limit: logsPerPage });
-      setOrderLogs(data);
+      setOrderLogs(data.items);
+      setTotalLogs(data.total);
+      setTotalApproximate(data.approximate);
     } catch (err: any) {
       setError('Failed to load logs');
     } finally {
@@ -80,7 +85,9 @@ export default function LogsPage() {
       if (ipFilter) filters.ip_address = ipFilter;
 
       const data = await logsService.activities.getAll(filters);
-      setActivityLogs(data);
+      setActivityLogs(data.items);
+      setTotalLogs(data.total);
+      setTotalApproximate(data.approximate);
     } catch (err: any) {
       setError('Failed to load logs');
     } finally {
@@ -100,8 +107,16 @@ export default function LogsPage() {
     try {
       setLoading(true);
       setError('');
-      const data = await logsService.apiRequests.getAll({ skip: (page - 1) * logsPerPage, limit: logsPerPage });
-      setApiLogs(data);
+      const filters: APIRequestLogFilters = {
+        skip: (page - 1) * logsPerPage,
+        limit: logsPerPage,
+      };
+      if (routeFilter) filters.route = routeFilter;
+
+      const data = await logsService.apiRequests.getAll(filters);
+      setApiLogs(data.items);
+      setTotalLogs(data.total);
+      setTotalApproximate(data.approximate);
     } catch (err: any) {
       setError('Failed to load API logs');
     } finally {
@@ -149,10 +164,11 @@ export default function LogsPage() {
     setSearchQuery('');
     setActivityTypeFilter('');
     setIpFilter('');
+    setRouteFilter('');
     setPage(1);
   };
 
-  const hasActiveFilters = searchQuery || activityTypeFilter || ipFilter;
+  const hasActiveFilters = searchQuery || activityTypeFilter || ipFilter || routeFilter;
 
   const getActionBadge = (action: string) => {
     const colors: Record<string, string> = {
@@ -292,12 +308,24 @@ export default function LogsPage() {
           <div className="bg-white p-6 rounded-lg shadow-sm border">
             <p className="text-sm text-gray-600">Avg Response Time</p>
             <p className="text-2xl font-bold mt-1">{(apiStats.avg_response_time * 1000).toFixed(0)}ms</p>
+            {apiStats.p50_response_time_ms !== null && (
+              <p className="text-xs text-gray-500 mt-1">
+                p50 {apiStats.p50_response_time_ms?.toFixed(0)}ms · p95 {apiStats.p95_response_time_ms?.toFixed(0)}ms · p99 {apiStats.p99_response_time_ms?.toFixed(0)}ms
+              </p>
+            )}
           </div>
           <div className="bg-white p-6 rounded-lg shadow-sm border">
-            <p className="text-sm text-gray-600 mb-2">By Method</p>
-            {Object.entries(apiStats.requests_by_method).sort(([,a],[,b]) => b-a).slice(0,3).map(([method,count]) => (
-              <div key={method} className="flex justify-between text-xs">
-                <span>{method}</span><span className="font-semibold">{count}</span>
+            <p className="text-sm text-gray-600 mb-2">Top Routes</p>
+            {Object.entries(apiStats.requests_by_route).slice(0,3).map(([route,count]) => (
+              <div key={route} className="flex justify-between gap-2 text-xs">
+                <button
+                  onClick={() => { setRouteFilter(route.split(' ').slice(1).join(' ')); setPage(1); }}
+                  className="truncate font-mono hover:underline text-left"
+                  title={route}
+                >
+                  {route}
+                </button>
+                <span className="font-semibold">{count}</span>
               </div>
             ))}
           </div>
@@ -404,6 +432,12 @@ export default function LogsPage() {
                 <X className="w-3 h-3 cursor-pointer" onClick={() => setActivityTypeFilter('')} />
               </span>
             )}
+            {routeFilter && (
+              <span className="inline-flex items-center gap-1 px-3 py-1 bg-orange-100 text-orange-800 text-sm rounded-full">
+                Route: {routeFilter}
+                <X className="w-3 h-3 cursor-pointer" onClick={() => setRouteFilter('')} />
+              </span>
+            )}
             {ipFilter && (
               <span className="inline-flex items-center gap-1 px-3 py-1 bg-purple-100 text-purple-800 text-sm rounded-full">
                 IP: {ipFilter}
@@ -416,7 +450,7 @@ export default function LogsPage() {
 
       {/* Results Info */}
       <div className="mb-4 text-sm text-gray-600">
-        Showing {currentLogs.length} logs {hasActiveFilters && '(filtered)'}
+        Showing {currentLogs.length} of {totalLogs !== null ? `${totalApproximate ? '~' : ''}${totalLogs.toLocaleString()}` : currentLogs.length} logs {hasActiveFilters && '(filtered)'}
       </div>
 
       {error && <div className="mb-4 p-3 bg-red-50 border border-red-200 text-red-700 text-sm rounded">{error}</div>}
@@ -446,7 +480,7 @@ export default function LogsPage() {
                   <>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">User</th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Method</th>
-                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Path</th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Route</th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Status</th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Time</th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">IP</th>
@@ -502,7 +536,13 @@ export default function LogsPage() {
                       {log.method}
                     </span>
                   </td>
-                  <td className="px-6 py-4 text-sm font-mono">{log.path}</td>
+                  <td className="px-6 py-4 text-sm font-mono">
+                    {log.route ? (
+                      <button onClick={() => { setRouteFilter(log.route!); setPage(1); }} className="hover:underline text-left" title={log.path}>
+                        {log.route}
+                      </button>
+                    ) : log.path}
+                  </td>
                   <td className="px-6 py-4">
                     <span className={`px-2 py-1 text-xs rounded-full ${getStatusBadge(log.status_code)}`}>
                       {log.status_code || 'N/A'}
@@ -521,13 +561,15 @@ export default function LogsPage() {
       </div>
 
       {/* Pagination */}
-      {currentLogs.length === logsPerPage && (
+      {(page > 1 || currentLogs.length === logsPerPage) && (
         <div className="mt-6 flex justify-center gap-2">
           <button onClick={() => setPage(p => p-1)} disabled={page === 1} className="px-4 py-2 border rounded-lg disabled:opacity-50 flex items-center gap-1">
             <ChevronLeft className="w-4 h-4" />Previous
           </button>
-          <span className="px-4 py-2">Page {page}</span>
-          <button onClick={() => setPage(p => p+1)} className="px-4 py-2 border rounded-lg flex items-center gap-1">
+          <span className="px-4 py-2">
+            Page {page}{totalLogs !== null && ` of ${totalApproximate ? '~' : ''}${Math.max(1, Math.ceil(totalLogs / logsPerPage)).toLocaleString()}`}
+          </span>
+          <button onClick={() => setPage(p => p+1)} disabled={currentLogs.length < logsPerPage} className="px-4 py-2 border rounded-lg disabled:opacity-50 flex items-center gap-1">
             Next<ChevronRight className="w-4 h-4" />
           </button>
         </div>
@@ -22,6 +22,8 @@ interface CartContextType {
   getCartCount: () => number;
 }
 
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+
 const CartContext = createContext<CartContextType | undefined>(undefined);
 
 export function CartProvider({ children }: { children: ReactNode }) {
@@ -92,6 +94,18 @@ export function CartProvider({ children }: { children: ReactNode }) {
       }
     });
 
+    // Record the add for the conversion funnel. Sent with fetch rather than apiClient so an
+    // expired token does not trigger its redirect to /login; failures are silently ignored.
+    const token = localStorage.getItem('access_token');
+    if (token) {
+      fetch(`${API_BASE_URL}/api/cart/events`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
+        body: JSON.stringify({ product_id: product.id, quantity }),
+        keepalive: true,
+      }).catch(() => {});
+    }
+
     return true;
   };
 
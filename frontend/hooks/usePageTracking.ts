@@ -3,49 +3,103 @@ import { usePathname } from 'next/navigation';
 import apiClient from '@/lib/api-client';
 import { authService } from '@/lib/services/auth';
 
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+const BATCH_ENDPOINT = '/api/logs/activities/batch';
+
+// Page visits are buffered and sent together instead of one request per navigation
+const FLUSH_INTERVAL_MS = 10000;
+const MAX_BUFFERED_EVENTS = 20;
+
+interface ActivityEvent {
+  activity_type: string;
+  user_id: number | null;
+  description: string;
+  details: Record<string, unknown>;
+}
+
+let buffer: ActivityEvent[] = [];
+let flushTimer: ReturnType<typeof setTimeout> | null = null;
+let unloadListenersAdded = false;
+
+/**
+ * Send buffered events. On page hide/unload sendBeacon is used so the
+ * request survives the page going away; the payload is sent as text/plain
+ * so it needs no CORS preflight.
+ */
+function flush(useBeacon = false) {
+  if (flushTimer) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+  }
+  if (buffer.length === 0) return;
+
+  const events = buffer;
+  buffer = [];
+
+  if (useBeacon && typeof navigator !== 'undefined' && navigator.sendBeacon) {
+    const payload = new Blob([JSON.stringify(events)], { type: 'text/plain' });
+    if (navigator.sendBeacon(`${API_BASE_URL}${BATCH_ENDPOINT}`, payload)) return;
+  }
+
+  // Silently fail - don't disrupt user experience if logging fails
+  apiClient.post(BATCH_ENDPOINT, events).catch(() => {});
+}
+
+function enqueue(event: ActivityEvent) {
+  buffer.push(event);
+
+  if (!unloadListenersAdded) {
+    unloadListenersAdded = true;
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') flush(true);
+    });
+    window.addEventListener('pagehide', () => flush(true));
+  }
+
+  if (buffer.length >= MAX_BUFFERED_EVENTS) {
+    flush();
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(() => flush(), FLUSH_INTERVAL_MS);
+  }
+}
+
 /**
  * Hook to track page visits and send them to the logging system
- * Automatically logs every page the user visits
+ * Automatically logs every page the user visits (sent in batches)
  */
 export function usePageTracking() {
   const pathname = usePathname();
 
   useEffect(() => {
-    const logPageVisit = async () => {
-      try {
-        // Get current user
-        const user = authService.getUser();
-
-        // Determine activity type based on path
-        let activityType = 'page_view';
-
-        if (pathname.includes('/admin')) {
-          activityType = 'admin_action';
-        } else if (pathname.includes('/products/') && pathname.split('/').length > 2) {
-          activityType = 'product_view';
-        } else if (pathname.includes('/cart')) {
-          activityType = 'cart_view';
-        } else if (pathname.includes('/orders')) {
-          activityType = 'order_view';
-        }
+    const logPageVisit = () => {
+      // Get current user
+      const user = authService.getUser();
+
+      // Determine activity type based on path
+      let activityType = 'page_view';
 
-        // Log the page visit
-        const logData = {
-          activity_type: activityType, // lowercase
-          user_id: user?.id || null,
-          description: `Visited ${pathname}`,
-          details: {
-            url: window.location.href,
-            path: pathname,
-            referrer: document.referrer,
-            timestamp: new Date().toISOString(),
-          }
-        };
-
-        await apiClient.post('/api/logs/activities', logData);
-      } catch (error) {
-        // Silently fail - don't disrupt user experience if logging fails
+      if (pathname.includes('/admin')) {
+        activityType = 'admin_action';
+      } else if (pathname.includes('/products/') && pathname.split('/').length > 2) {
+        activityType = 'product_view';
+      } else if (pathname.includes('/cart')) {
+        activityType = 'cart_view';
+      } else if (pathname.includes('/orders')) {
+        activityType = 'order_view';
       }
+
+      // Queue the page visit
+      enqueue({
+        activity_type: activityType, // lowercase
+        user_id: user?.id || null,
+        description: `Visited ${pathname}`,
+        details: {
+          url: window.location.href,
+          path: pathname,
+          referrer: document.referrer,
+          timestamp: new Date().toISOString(),
+        }
+      });
     };
 
     // Log after a small delay to ensure the page is loaded
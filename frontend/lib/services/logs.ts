@@ -1,5 +1,22 @@
+import { AxiosResponse } from 'axios';
 import apiClient from '../api-client';
 
+// A page of list results with the total from the X-Total-Count header
+export interface LogPage<T> {
+  items: T[];
+  total: number | null;
+  approximate: boolean; // total is a planner estimate (large tables)
+}
+
+function toPage<T>(response: AxiosResponse<T[]>): LogPage<T> {
+  const total = response.headers['x-total-count'];
+  return {
+    items: response.data,
+    total: total !== undefined ? Number(total) : null,
+    approximate: response.headers['x-total-count-approximate'] === 'true',
+  };
+}
+
 // Order/Transaction Logs
 export interface OrderLog {
   id: number;
@@ -78,12 +95,14 @@ export interface APIRequestLog {
   user_id: number | null;
   method: string;
   path: string;
+  route: string | null;
   endpoint: string | null;
   status_code: number | null;
   response_time: number | null;
   ip_address: string | null;
   user_agent: string | null;
   query_params: Record<string, any> | null;
+  sample_weight: number;
   created_at: string;
   user_email: string | null;
   user_username: string | null;
@@ -93,14 +112,19 @@ export interface APIRequestLogStats {
   total_requests: number;
   requests_by_method: Record<string, number>;
   requests_by_status: Record<string, number>;
+  requests_by_route: Record<string, number>;
   avg_response_time: number;
   recent_requests_count: number;
+  p50_response_time_ms: number | null;
+  p95_response_time_ms: number | null;
+  p99_response_time_ms: number | null;
 }
 
 export interface APIRequestLogFilters {
   user_id?: number;
   method?: string;
   path?: string;
+  route?: string;
   status_code?: number;
   start_date?: string;
   end_date?: string;
@@ -110,9 +134,9 @@ export interface APIRequestLogFilters {
 
 export const logsService = {
   orders: {
-    async getAll(filters?: OrderLogFilters): Promise<OrderLog[]> {
+    async getAll(filters?: OrderLogFilters): Promise<LogPage<OrderLog>> {
       const response = await apiClient.get<OrderLog[]>('/api/logs/orders', { params: filters });
-      return response.data;
+      return toPage(response);
     },
 
     async getStats(days: number = 30): Promise<OrderLogStats> {
@@ -122,9 +146,9 @@ export const logsService = {
   },
 
   activities: {
-    async getAll(filters?: UserActivityLogFilters): Promise<UserActivityLog[]> {
+    async getAll(filters?: UserActivityLogFilters): Promise<LogPage<UserActivityLog>> {
       const response = await apiClient.get<UserActivityLog[]>('/api/logs/activities', { params: filters });
-      return response.data;
+      return toPage(response);
     },
 
     async getStats(days: number = 30): Promise<UserActivityLogStats> {
@@ -134,9 +158,9 @@ export const logsService = {
   },
 
   apiRequests: {
-    async getAll(filters?: APIRequestLogFilters): Promise<APIRequestLog[]> {
+    async getAll(filters?: APIRequestLogFilters): Promise<LogPage<APIRequestLog>> {
       const response = await apiClient.get<APIRequestLog[]>('/api/logs/api-requests', { params: filters });
-      return response.data;
+      return toPage(response);
     },
 
     async getStats(days: number = 30): Promise<APIRequestLogStats> {